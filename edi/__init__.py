@@ -20,12 +20,14 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
+import os
 import argparse
 import argcomplete
 import logging
 from edi.commands import *
 from edi.lib.commandfactory import get_sub_commands, get_command
-from edi.lib.helpers import print_error_and_exit, FatalError
+from edi.lib.helpers import print_error_and_exit, FatalError, get_edi_cache_directory
+from edi.lib.jinja2helpers import enable_bytecode_cache
 from edi.lib.edicommand import EdiCommand
 from subprocess import CalledProcessError
 
@@ -67,6 +69,7 @@ def main():
         cli_interface = _setup_command_line_interface()
         cli_args = cli_interface.parse_args(sys.argv[1:])
         _setup_logging(cli_args)
+        enable_bytecode_cache(os.path.join(get_edi_cache_directory(), "jinja2"))
 
         if cli_args.command_name is None:
             raise FatalError("Missing subcommand. Use 'edi --help' for help.")
@@ -28,13 +28,18 @@ from aptsources.sourceslist import SourceEntry
 from edi.commands.image import Image
 from edi.commands.qemucommands.fetch import Fetch
 from edi.lib.helpers import (require_executable, FatalError,
-                             chown_to_user, print_success)
+                             chown_to_user, print_success, get_edi_cache_directory)
 from edi.lib.shellhelpers import run, get_chroot_cmd
-from edi.lib.keyhelpers import fetch_repository_key, build_keyring
+from edi.lib.keyhelpers import fetch_repository_key, get_keyring
 
 
 class Bootstrap(Image):
 
+    # Ansible uses python on the target system
+    # sudo is needed for privilege escalation
+    _additional_packages = ("python,sudo,netbase,net-tools,iputils-ping,ifupdown,isc-dhcp-client,"
+                            "resolvconf,systemd,systemd-sysv,gnupg")
+
     @classmethod
     def advertise(cls, subparsers):
         help_text = "bootstrap an initial image"
@@ -50,12 +55,17 @@ class Bootstrap(Image):
     def run(self, config_file):
         self._setup_parser(config_file)
 
-        if os.path.isfile(self._result()):
+        fingerprint = self._get_fingerprint()
+        if os.path.isfile(self._result()) and self._is_up_to_date(fingerprint):
             logging.info(("{0} is already there. "
-                          "Delete it to regenerate it."
+                          "Use 'edi image clean' to regenerate it."
                           ).format(self._result()))
             return self._result()
 
+        if self._restore_artifact(fingerprint):
+            print_success("Restored bootstrap image {} from the artifact store.".format(self._result()))
+            return self._result()
+
         self._require_sudo()
 
         qemu_executable = Fetch().run(config_file)
@@ -72,13 +82,17 @@ class Bootstrap(Image):
 
         with tempfile.TemporaryDirectory(dir=workdir) as tempdir:
             chown_to_user(tempdir)
-            key_data = fetch_repository_key(self.config.get_bootstrap_repository_key())
-            keyring_file = build_keyring(tempdir, "temp_keyring.gpg", key_data)
+            key_data = fetch_repository_key(self.config.get_bootstrap_repository_key(),
+                                            cache_directory=get_edi_cache_directory(),
+                                            fingerprint=self.config.get_bootstrap_repository_key_fingerprint())
+            keyring_file = get_keyring(key_data, cache_directory=get_edi_cache_directory())
             rootfs = self._run_debootstrap(tempdir, keyring_file, qemu_executable)
             self._postprocess_rootfs(rootfs, key_data)
             archive = self._pack_image(tempdir, rootfs)
             chown_to_user(archive)
             shutil.move(archive, self._result())
+            self._write_fingerprint(fingerprint)
+            self._store_artifact(fingerprint)
 
         print_success("Bootstrapped initial image {}.".format(self._result()))
 
@@ -92,6 +106,9 @@ class Bootstrap(Image):
             os.remove(self._result())
             print_success("Removed bootstrap image {}.".format(self._result()))
 
+        self._remove_artifact()
+        self._remove_fingerprint()
+
     def _result(self):
         archive_name = ("{0}_{1}.tar.{2}"
                         ).format(self.config.get_project_name(),
@@ -99,11 +116,17 @@ class Bootstrap(Image):
                                  self.config.get_compression())
         return os.path.join(self.config.get_workdir(), archive_name)
 
+    def _get_fingerprint_inputs(self):
+        return {'tool': self.config.get_bootstrap_tool(),
+                'repository': self.config.get_bootstrap_repository(),
+                'repository_key': self.config.get_bootstrap_repository_key(),
+                'repository_key_fingerprint': self.config.get_bootstrap_repository_key_fingerprint(),
+                'architecture': self.config.get_bootstrap_architecture(),
+                'additional_packages': self._additional_packages,
+                'compression': self.config.get_compression(),
+                'qemu': Fetch().get_fingerprint(self.config_file)}
+
     def _run_debootstrap(self, tempdir, keyring_file, qemu_executable):
-        # Ansible uses python on the target system
-        # sudo is needed for privilege escalation
-        additional_packages = ("python,sudo,netbase,net-tools,iputils-ping,ifupdown,isc-dhcp-client,"
-                               "resolvconf,systemd,systemd-sysv,gnupg")
         rootfs = os.path.join(tempdir, "rootfs")
         bootstrap_source = SourceEntry(self.config.get_bootstrap_repository())
         components = ",".join(bootstrap_source.comps)
@@ -114,7 +137,7 @@ class Bootstrap(Image):
         if qemu_executable:
             cmd.append("--foreign")
         cmd.append("--variant=minbase")
-        cmd.append("--include={0}".format(additional_packages))
+        cmd.append("--include={0}".format(self._additional_packages))
         cmd.append("--components={0}".format(components))
         if keyring_file:
             cmd.append("--force-check-gpg")
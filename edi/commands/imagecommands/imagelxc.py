@@ -24,15 +24,15 @@ import os
 import tempfile
 import time
 import calendar
-import yaml
 import shutil
 import glob
-from jinja2 import Template
 from codecs import open
 from edi.commands.image import Image
 from edi.commands.imagecommands.bootstrap import Bootstrap
 from edi.lib.helpers import chown_to_user, print_success
 from edi.lib.shellhelpers import get_debian_architecture
+from edi.lib.yamlhelpers import safe_load, safe_dump, LazyDump
+from edi.lib.jinja2helpers import render_template
 
 
 class Lxc(Image):
@@ -52,12 +52,17 @@ class Lxc(Image):
     def run(self, config_file):
         self._setup_parser(config_file)
 
-        if os.path.isfile(self._result()):
+        fingerprint = self._get_fingerprint()
+        if os.path.isfile(self._result()) and self._is_up_to_date(fingerprint):
             logging.info(("{0} is already there. "
-                          "Delete it to regenerate it."
+                          "Use 'edi image clean' to regenerate it."
                           ).format(self._result()))
             return self._result()
 
+        if self._restore_artifact(fingerprint):
+            print_success("Restored lxc image {} from the artifact store.".format(self._result()))
+            return self._result()
+
         self._require_sudo()
 
         bootstrap_cmd = Bootstrap()
@@ -77,6 +82,8 @@ class Lxc(Image):
             archive = self._pack_image(tempdir, lxcimagedir)
             chown_to_user(archive)
             shutil.move(archive, self._result())
+            self._write_fingerprint(fingerprint)
+            self._store_artifact(fingerprint)
 
         print_success("Created lxc image {}.".format(self._result()))
 
@@ -90,6 +97,9 @@ class Lxc(Image):
             os.remove(self._result())
             print_success("Removed lxc image {}.".format(self._result()))
 
+        self._remove_artifact()
+        self._remove_fingerprint()
+
     def _result(self):
         archive_name = ("{0}_{1}.tar.{2}"
                         ).format(self.config.get_project_name(),
@@ -97,6 +107,21 @@ class Lxc(Image):
                                  self.config.get_compression())
         return os.path.join(self.config.get_workdir(), archive_name)
 
+    def _get_fingerprint_inputs(self):
+        templates = []
+        for name, path, dictionary in self.config.get_ordered_path_items("lxc_templates"):
+            tpl_files = sorted(glob.glob(os.path.join(os.path.dirname(path), "*.tpl")))
+            templates.append({'name': name,
+                              'template': self._get_file_fingerprint(path),
+                              'dictionary': dictionary,
+                              'tpl_files': [[os.path.basename(tpl_file), self._get_file_fingerprint(tpl_file)]
+                                            for tpl_file in tpl_files if os.path.isfile(tpl_file)]})
+
+        return {'architecture': get_debian_architecture(),
+                'templates': templates,
+                'compression': self.config.get_compression(),
+                'bootstrap': Bootstrap().get_fingerprint(self.config_file)}
+
     def _write_container_metadata(self, imagedir):
         metadata = {}
         # we build this container for the host architecture
@@ -112,15 +137,11 @@ class Lxc(Image):
             os.mkdir(templates_dest)
 
         for name, path, dictionary in template_list:
-            logging.info(("Loading template {} located in "
-                          "{} with dictionary:\n{}"
-                          ).format(name, path,
-                                   yaml.dump(dictionary,
-                                             default_flow_style=False)))
+            logging.info("Loading template %s located in %s with dictionary:\n%s",
+                         name, path, LazyDump(dictionary))
 
             with open(path, encoding="UTF-8", mode="r") as template_file:
-                template = Template(template_file.read())
-                sub_node = yaml.load(template.render(dictionary))
+                sub_node = safe_load(render_template(template_file.read(), dictionary))
 
             template_node = dict(template_node, **sub_node)
 
@@ -137,4 +158,4 @@ class Lxc(Image):
         metadatafile = os.path.join(imagedir, "metadata.yaml")
 
         with open(metadatafile, encoding='utf-8', mode='w') as f:
-            f.write(yaml.dump(metadata))
+            f.write(safe_dump(metadata))
@@ -20,6 +20,7 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import os
 import subprocess
 from edi.commands.lxc import Lxc
 from edi.commands.imagecommands.imagelxc import Lxc as LxcImageCommand
@@ -44,17 +45,24 @@ class Import(Lxc):
     def run(self, config_file):
         self._setup_parser(config_file)
 
+        fingerprint = self._get_fingerprint()
         if self._is_in_image_store():
-            logging.info(("{0} is already in image store. "
-                          "Delete it to regenerate it."
-                          ).format(self._result()))
-            return self._result()
+            if self._is_up_to_date(fingerprint):
+                logging.info(("{0} is already in image store. "
+                              "Delete it to regenerate it."
+                              ).format(self._result()))
+                return self._result()
+            else:
+                logging.info(("Removing outdated '{}' from image store."
+                              ).format(self._result()))
+                self._delete_image()
 
         image = LxcImageCommand().run(config_file)
 
         print("Going to import lxc image into image store.")
 
         self._import_image(image)
+        self._write_fingerprint(fingerprint)
 
         print_success("Imported lxc image into image store as {}.".format(self._result()))
 
@@ -69,10 +77,18 @@ class Import(Lxc):
             self._delete_image()
             print_success("Removed {} from image store.".format(self._result()))
 
+        self._remove_fingerprint()
+
     def _result(self):
         return "{}_{}".format(self.config.get_project_name(),
                               self._get_command_file_name_prefix())
 
+    def _get_fingerprint_inputs(self):
+        return {'image': LxcImageCommand().get_fingerprint(self.config_file)}
+
+    def _get_fingerprint_file(self):
+        return os.path.join(self.config.get_workdir(), "{}.fingerprint".format(self._result()))
+
     def _is_in_image_store(self):
         cmd = []
         cmd.append("lxc")
@@ -21,13 +21,13 @@
 
 import logging
 import subprocess
-import yaml
 from edi.commands.lxc import Lxc
 from edi.commands.lxccommands.importcmd import Import
 from edi.commands.lxccommands.profile import Profile
 from edi.lib.helpers import FatalError, print_success
 from edi.lib.shellhelpers import run
 from edi.lib.networkhelpers import is_valid_hostname
+from edi.lib.yamlhelpers import safe_load, YAMLError
 
 
 class Launch(Lxc):
@@ -92,7 +92,7 @@ class Launch(Lxc):
         result = run(cmd, stdout=subprocess.PIPE)
 
         try:
-            parsed_result = yaml.load(result.stdout)
+            parsed_result = safe_load(result.stdout)
             if len(parsed_result) != 1:
                 return False
             else:
@@ -101,7 +101,7 @@ class Launch(Lxc):
                     return True
                 else:
                     return False
-        except yaml.YAMLError as exc:
+        except YAMLError as exc:
             raise FatalError("Unable to parse lxc output ({}).".format(exc))
 
     def _launch_container(self, image, profiles):
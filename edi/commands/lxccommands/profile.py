@@ -21,14 +21,14 @@
 
 
 import logging
-import yaml
 import hashlib
 import subprocess
-from jinja2 import Template
 from edi.commands.lxc import Lxc
 from edi.lib.shellhelpers import run
 from edi.lib.helpers import print_success
 from edi.lib.sharedfoldercoordinator import SharedFolderCoordinator
+from edi.lib.yamlhelpers import safe_load, safe_dump, LazyDump
+from edi.lib.jinja2helpers import render_template
 
 
 class Profile(Lxc):
@@ -53,15 +53,11 @@ class Profile(Lxc):
         profile_list = self.config.get_ordered_path_items("lxc_profiles")
         profile_name_list = []
         for name, path, dictionary in profile_list:
-            logging.info(("Creating profile {} located in "
-                          "{} with dictionary:\n{}"
-                          ).format(name, path,
-                                   yaml.dump(dictionary,
-                                             default_flow_style=False)))
+            logging.info("Creating profile %s located in %s with dictionary:\n%s",
+                         name, path, LazyDump(dictionary))
 
             with open(path, encoding="UTF-8", mode="r") as profile_file:
-                profile = Template(profile_file.read())
-                profile_text = profile.render(dictionary)
+                profile_text = render_template(profile_file.read(), dictionary)
                 name = self._write_lxc_profile(profile_text)
                 profile_name_list.append(name)
 
@@ -88,14 +84,14 @@ class Profile(Lxc):
         return result.returncode == 0
 
     def _write_lxc_profile(self, profile_text):
-        profile_yaml = yaml.load(profile_text)
+        profile_yaml = safe_load(profile_text)
         profile_hash = hashlib.sha256(profile_text.encode()
                                       ).hexdigest()[:20]
         profile_name = profile_yaml.get("name", "anonymous")
         ext_profile_name = "{}_{}".format(profile_name,
                                           profile_hash)
         profile_yaml["name"] = ext_profile_name
-        profile_content = yaml.dump(profile_yaml,
+        profile_content = safe_dump(profile_yaml,
                                     default_flow_style=False)
 
         if not self._is_profile_existing(ext_profile_name):
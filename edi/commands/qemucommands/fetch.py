@@ -20,7 +20,9 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 from edi.commands.qemu import Qemu
-from edi.lib.helpers import print_success, chown_to_user, FatalError
+from edi.lib.helpers import (print_success, chown_to_user, FatalError, get_edi_cache_directory,
+                             create_user_directory, chown_to_user_if_root)
+from edi.lib.filehelpers import file_lock
 from edi.lib.shellhelpers import get_user_environment_variable, get_debian_architecture
 import apt_inst
 import tempfile
@@ -49,12 +51,17 @@ class Fetch(Qemu):
         if not self._needs_qemu():
             return None
 
-        if os.path.isfile(self._result()):
+        fingerprint = self._get_fingerprint()
+        if os.path.isfile(self._result()) and self._is_up_to_date(fingerprint):
             logging.info(("{0} is already there. "
-                          "Delete it to re-fetch it."
+                          "Use 'edi qemu clean' to re-fetch it."
                           ).format(self._result()))
             return self._result()
 
+        if self._restore_artifact(fingerprint):
+            print_success("Restored QEMU binary {} from the artifact store.".format(self._result()))
+            return self._result()
+
         qemu_package = self.config.get_qemu_package_name()
         print("Going to fetch qemu Debian package ({}).".format(qemu_package))
 
@@ -63,26 +70,42 @@ class Fetch(Qemu):
         with tempfile.TemporaryDirectory(dir=workdir) as tempdir:
             chown_to_user(tempdir)
 
-            qemu_repository = self.config.get_qemu_repository()
-
-            if qemu_repository:
-                key_url = self.config.get_qemu_repository_key()
-            else:
-                qemu_repository = self.config.get_bootstrap_repository()
-                key_url = self.config.get_bootstrap_repository_key()
+            qemu_repository, key_url, key_fingerprint = self._get_qemu_repository()
 
             d = PackageDownloader(repository=qemu_repository, repository_key=key_url,
-                                  architectures=[get_debian_architecture()])
-            package_file = d.download(package_name=qemu_package, dest=tempdir)
-
-            apt_inst.DebFile(package_file).data.extractall(tempdir)
+                                  repository_key_fingerprint=key_fingerprint,
+                                  architectures=[get_debian_architecture()],
+                                  cache_directory=get_edi_cache_directory())
+            self._download_and_extract(d, qemu_package, tempdir)
             qemu_binary = os.path.join(tempdir, 'usr', 'bin', self._get_qemu_binary_name())
             chown_to_user(qemu_binary)
             shutil.move(qemu_binary, self._result())
+            self._write_fingerprint(fingerprint)
+            self._store_artifact(fingerprint)
 
         print_success("Fetched qemu binary {}.".format(self._result()))
         return self._result()
 
+    @staticmethod
+    def _download_and_extract(downloader, package_name, tempdir):
+        # an interrupted download gets resumed by the next run
+        download_directory = os.path.join(get_edi_cache_directory(), 'downloads')
+        try:
+            create_user_directory(download_directory)
+        except OSError as error:
+            logging.warning("Unable to use the download cache '{}' ({}).".format(download_directory, error))
+            package_file = downloader.download(package_name=package_name, dest=tempdir)
+            apt_inst.DebFile(package_file).data.extractall(tempdir)
+            return
+
+        # concurrent runs must neither share the partial download nor remove the package of another run
+        lock_file = os.path.join(download_directory, '{}.lock'.format(package_name))
+        with file_lock(lock_file):
+            chown_to_user_if_root(lock_file)
+            package_file = downloader.download(package_name=package_name, dest=download_directory)
+            apt_inst.DebFile(package_file).data.extractall(tempdir)
+            os.remove(package_file)
+
     def clean(self, config_file):
         self._setup_parser(config_file)
 
@@ -94,12 +117,40 @@ class Fetch(Qemu):
             os.remove(result)
             print_success("Removed QEMU binary {}.".format(result))
 
+        self._remove_artifact()
+        self._remove_fingerprint()
+
     def _result(self):
         if not self._needs_qemu():
             return None
         else:
             return os.path.join(self.config.get_workdir(), self._get_qemu_binary_name())
 
+    def _get_fingerprint_inputs(self):
+        if not self._needs_qemu():
+            return None
+
+        repository, key_url, key_fingerprint = self._get_qemu_repository()
+        return {'repository': repository,
+                'repository_key': key_url,
+                'repository_key_fingerprint': key_fingerprint,
+                'package': self.config.get_qemu_package_name(),
+                'host_architecture': get_debian_architecture(),
+                'binary': self._get_qemu_binary_name()}
+
+    def _get_qemu_repository(self):
+        """
+        :return: the repository, the key url and the key fingerprint used to fetch the QEMU package
+        """
+        qemu_repository = self.config.get_qemu_repository()
+
+        if qemu_repository:
+            return (qemu_repository, self.config.get_qemu_repository_key(),
+                    self.config.get_qemu_repository_key_fingerprint())
+        else:
+            return (self.config.get_bootstrap_repository(), self.config.get_bootstrap_repository_key(),
+                    self.config.get_bootstrap_repository_key_fingerprint())
+
     def _get_qemu_binary_name(self):
         arch_dict = {'amd64': 'x86_64',
                      'arm64': 'aarch64',
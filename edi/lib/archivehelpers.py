@@ -20,8 +20,10 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 import zlib
+import gzip
 import bz2
 import lzma
+import re
 from functools import partial
 from edi.lib.helpers import FatalError
 
@@ -42,3 +44,79 @@ def decompress(data):
         if data.startswith(item[0]):
             return item[1](data)
     raise FatalError("Unknown compression type!")
+
+
+opener_from_magic = [
+    (b'\x1f\x8b\x08', partial(gzip.open)), # gz
+    (b'\x42\x5a\x68', partial(bz2.open)), # bz2
+    (b'\xfd\x37\x7a\x58\x5a\x00', partial(lzma.open)), # xz
+    ]
+
+_max_magic_length = max(len(item[0]) for item in opener_from_magic)
+
+
+def open_compressed(file_name):
+    """
+    Opens a compressed file for streamed reading.
+    The compression algorithm gets derived from the magic bytes of the file.
+    :param file_name: a gz, bz2 or xz compressed file
+    :return: a binary file object that decompresses the data on the fly
+    """
+    with open(file_name, mode='rb') as f:
+        magic = f.read(_max_magic_length)
+
+    for item in opener_from_magic:
+        if magic.startswith(item[0]):
+            return item[1](file_name, mode='rb')
+    raise FatalError("Unknown compression type!")
+
+
+def iter_paragraphs_with_offset(file_object):
+    """
+    Iterates over the paragraphs of a (Debian control) file without loading the whole file.
+    :param file_object: a binary file object (e.g. from open_compressed)
+    :return: yields tuples (offset, paragraph) where paragraph is the raw paragraph (bytes)
+    """
+    lines = []
+    offset = 0
+    start = 0
+    for line in file_object:
+        if line.strip():
+            if not lines:
+                start = offset
+            lines.append(line)
+        elif lines:
+            yield start, b''.join(lines)
+            lines = []
+        offset += len(line)
+
+    if lines:
+        yield start, b''.join(lines)
+
+
+def get_paragraph_field(paragraph, field):
+    """
+    Cheaply extracts a single line field from a raw paragraph without parsing it.
+    :param paragraph: a raw paragraph (bytes)
+    :param field: the name of the field (e.g. 'Package')
+    :return: the value of the field (str) or None if the field is missing
+    """
+    match = re.search(b'^' + re.escape(field.encode()) + rb':[ \t]*(\S+)', paragraph, re.MULTILINE)
+    if match:
+        return match.group(1).decode()
+    else:
+        return None
+
+
+def get_paragraph_value(paragraph, field):
+    """
+    Extracts the complete (possibly multi line) value of a field from a raw paragraph without parsing it.
+    :param paragraph: a raw paragraph (bytes)
+    :param field: the name of the field (e.g. 'Provides')
+    :return: the value of the field (str) or None if the field is missing
+    """
+    match = re.search(b'^' + re.escape(field.encode()) + rb':[ \t]*(.*(?:\n[ \t].*)*)', paragraph, re.MULTILINE)
+    if match:
+        return match.group(1).decode().strip()
+    else:
+        return None
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2016 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import json
+import time
+import logging
+from edi.lib.helpers import create_user_directory, chown_to_user_if_root
+from edi.lib.filehelpers import hash_file, link_file, write_file_atomically
+
+
+class ArtifactStore():
+    """
+    Content addressed store for the artifacts (bootstrap images, QEMU binaries, lxc images)
+    built by edi. An artifact is addressed by the fingerprint of the inputs it got built from
+    and can therefore be shared across projects. Every artifact is accompanied by a small json
+    file that keeps its checksum and the time it got used the last time. If the store grows
+    beyond its maximum size, the least recently used artifacts get evicted.
+    """
+
+    def __init__(self, cache_directory, max_size):
+        """
+        :param cache_directory: the root folder of the edi cache
+        :param max_size: the maximum size of the store in bytes
+        """
+        self._directory = os.path.join(cache_directory, 'artifacts')
+        self._max_size = max_size
+
+    def _get_path(self, fingerprint):
+        return os.path.join(self._directory, fingerprint)
+
+    def _get_info_path(self, fingerprint):
+        return '{}.json'.format(self._get_path(fingerprint))
+
+    def _read_info(self, fingerprint):
+        try:
+            with open(self._get_info_path(fingerprint), encoding='utf-8', mode='r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_info(self, fingerprint, info):
+        info_path = self._get_info_path(fingerprint)
+        write_file_atomically(info_path, json.dumps(info))
+        chown_to_user_if_root(info_path)
+
+    def fetch(self, fingerprint, destination):
+        """
+        Materializes an artifact (using a hard link if possible).
+        :param fingerprint: the fingerprint of the inputs of the artifact
+        :param destination: the path the artifact shall be made available at
+        :return: the destination or None if the store does not contain a valid artifact
+        """
+        path = self._get_path(fingerprint)
+        info = self._read_info(fingerprint)
+        if not os.path.isfile(path) or not info.get('sha256'):
+            return None
+
+        # the materialized artifact might share its inode with the stored artifact
+        if hash_file(path, 'sha256') != info.get('sha256'):
+            logging.warning("Removing corrupt artifact '{}' from the artifact store.".format(path))
+            self.remove(fingerprint)
+            return None
+
+        info['last_used'] = time.time()
+        self._write_info(fingerprint, info)
+        logging.info("Materializing artifact '{}' as '{}'.".format(path, destination))
+        return link_file(path, destination)
+
+    def store(self, fingerprint, source):
+        """
+        Adds an artifact to the store (using a hard link if possible).
+        :param fingerprint: the fingerprint of the inputs of the artifact
+        :param source: the artifact
+        :return: the path to the stored artifact
+        """
+        create_user_directory(self._directory)
+        path = link_file(source, self._get_path(fingerprint))
+        chown_to_user_if_root(path)
+        self._write_info(fingerprint, {'sha256': hash_file(path, 'sha256'),
+                                       'size': os.path.getsize(path),
+                                       'last_used': time.time()})
+        logging.info("Stored artifact '{}' as '{}'.".format(source, path))
+        self.evict(keep=fingerprint)
+        return path
+
+    def remove(self, fingerprint):
+        if os.path.isfile(self._get_path(fingerprint)):
+            logging.info("Removing artifact '{}' from the artifact store.".format(fingerprint))
+        for path in [self._get_path(fingerprint), self._get_info_path(fingerprint)]:
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used artifacts until the store fits into its maximum size.
+        :param keep: the fingerprint of an artifact that must not get evicted
+        """
+        if not os.path.isdir(self._directory):
+            return
+
+        artifacts = []
+        for entry in os.scandir(self._directory):
+            # skip the info files and the temporary files of concurrent writers
+            if entry.is_file() and not entry.name.endswith('.json') and not entry.name.startswith('.'):
+                info = self._read_info(entry.name)
+                artifacts.append((info.get('last_used', 0), entry.name, entry.stat().st_size))
+
+        total_size = sum(size for _, _, size in artifacts)
+        for _, fingerprint, size in sorted(artifacts):
+            if total_size <= self._max_size:
+                break
+            if fingerprint == keep:
+                continue
+            logging.info("Evicting artifact '{}' from the artifact store.".format(fingerprint))
+            self.remove(fingerprint)
+            total_size -= size
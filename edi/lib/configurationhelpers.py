@@ -20,14 +20,18 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import jinja2
-import yaml
+import concurrent.futures
 from codecs import open
 from edi.lib.helpers import FatalError, get_edi_plugin_directory
+from edi.lib.yamlhelpers import safe_load
+from edi.lib.jinja2helpers import render_template
 
 
 placeholder = 'PROJECTNAME'
 
+# starting worker processes only pays off for large template trees
+_parallel_rendering_threshold = 500
+
 
 def get_available_templates():
     template_dir = os.path.join(get_edi_plugin_directory(), 'config_templates')
@@ -60,42 +64,85 @@ class ConfigurationTemplate():
         """
         self._folder = os.path.abspath(folder)
 
-    def render(self, dictionary):
+    def render(self, dictionary, max_workers=None):
         """
         Renders the configuration template "in place".
         :param dictionary: the dictionary that gets applied during the rendering operations
+        :param max_workers: the maximum number of processes that render files concurrently (by default
+                            the files get rendered within the current process unless the tree is large)
         :return: list: returns a list of the resulting files
         """
         if not dictionary.get('edi_project_name'):
             raise FatalError('''Missing or empty dictionary entry 'edi_project_name'!''')
 
-        self._walk_over_files(self._render_jinja2, dictionary, self._is_real_file)
-        self._walk_over_files(self._rename_file, dictionary, os.path.isfile)
-        self._walk_over_files(self._replace_edilink, dictionary, self._is_edilink)
-        self._walk_over_files(self._hide_edihidden, dictionary, self._is_edihidden)
-        return self._walk_over_files(self._no_operation)
+        paths = []
+        tree = self._scan_directory(self._folder, paths)
+
+        if max_workers is None and len(paths) >= _parallel_rendering_threshold:
+            max_workers = os.cpu_count()
+
+        if not max_workers or max_workers == 1:
+            for path in paths:
+                _render_jinja2(path, dictionary)
+        else:
+            # rendering is cpu bound - worker threads would be serialized by the GIL
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                for rendering in [executor.submit(_render_jinja2, path, dictionary) for path in paths]:
+                    rendering.result()
 
-    def _walk_over_files(self, operation, dictionary={}, custom_filter=None):
-        def _filter_it(path):
-            return not custom_filter or custom_filter and custom_filter(path)
+        return self._apply_operations(tree, dictionary)
 
+    def _scan_directory(self, directory, paths):
+        """
+        Traverses the directory once, classifies every entry and collects the real files that need to get rendered.
+        :return: a tuple (files, folders) where files is a list of (path, is_file) and folders
+                 is a list of (path, tree) - tree is None for symbolic links
+        """
+        files = []
+        folders = []
+        for entry in os.scandir(directory):
+            if entry.is_dir():
+                subtree = None
+                if not entry.is_symlink():
+                    subtree = self._scan_directory(entry.path, paths)
+                folders.append((entry.path, subtree))
+            else:
+                if entry.is_file(follow_symlinks=False):
+                    paths.append(entry.path)
+                files.append((entry.path, entry.is_file()))
+
+        return files, folders
+
+    def _apply_operations(self, tree, dictionary):
+        """
+        Applies the remaining operations (rename, edilink, edihidden) bottom up.
+        :return: list: the resulting files and folders
+        """
         touched_files = []
-        for root, dirs, files in os.walk(self._folder, topdown=False):
-            for name in files:
-                path = os.path.join(root, name)
-                if _filter_it(path):
-                    touched_files.append(operation(path, **dictionary))
-            for name in dirs:
-                path = os.path.join(root, name)
-                if _filter_it(path):
-                    touched_files.append(operation(path, **dictionary))
+        files, folders = tree
+
+        for path, is_file in files:
+            if is_file:
+                path = self._rename_file(path, **dictionary)
+            if self._is_edilink(path):
+                path = self._replace_edilink(path)
+            if self._is_edihidden(path):
+                path = self._hide_edihidden(path)
+            touched_files.append(path)
+
+        for original_path, subtree in folders:
+            children = []
+            if subtree:
+                children = self._apply_operations(subtree, dictionary)
+            path = original_path
+            if self._is_edihidden(path):
+                path = self._hide_edihidden(path)
+                children = [os.path.join(path, os.path.relpath(child, original_path)) for child in children]
+            touched_files.extend(children)
+            touched_files.append(path)
 
         return touched_files
 
-    @staticmethod
-    def _is_real_file(path):
-        return os.path.isfile(path) and not os.path.islink(path)
-
     @staticmethod
     def _is_edilink(path):
         _, extension = os.path.splitext(path)
@@ -106,18 +153,6 @@ class ConfigurationTemplate():
         _, extension = os.path.splitext(path)
         return extension == '.edihidden'
 
-    @staticmethod
-    def _render_jinja2(path, **kwargs):
-        dictionary = kwargs
-        with open(path, encoding="UTF-8", mode="r") as template_file:
-            template = jinja2.Template(template_file.read(), trim_blocks=True, lstrip_blocks=True)
-            result = template.render(dictionary)
-
-        with open(path, encoding="UTF-8", mode="w") as result_file:
-            result_file.write(result)
-
-        return path
-
     @staticmethod
     def _rename_file(path, edi_project_name=None, **_):
         directory = os.path.dirname(path)
@@ -132,7 +167,7 @@ class ConfigurationTemplate():
     @staticmethod
     def _replace_edilink(path, **_):
         with open(path, mode='r', encoding='utf-8') as link_file:
-            link_target = yaml.load(link_file.read()).get('link')
+            link_target = safe_load(link_file.read()).get('link')
 
         new_link, _ = os.path.splitext(path)
         os.remove(path)
@@ -147,6 +182,16 @@ class ConfigurationTemplate():
         os.rename(path, new_file)
         return new_file
 
-    @staticmethod
-    def _no_operation(path, **kwargs):
-        return path
\ No newline at end of file
+
+def _render_jinja2(path, dictionary):
+    # module level function: it gets pickled when the rendering happens in a worker process
+    with open(path, encoding="UTF-8", mode="r") as template_file:
+        source = template_file.read()
+
+    result = render_template(source, dictionary, compact=True)
+    # avoid needless writes (the compact mode preserves the trailing newline)
+    if result != source:
+        with open(path, encoding="UTF-8", mode="w") as result_file:
+            result_file.write(result)
+
+    return path
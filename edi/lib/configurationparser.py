@@ -19,20 +19,44 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
-import yaml
+import json
+import hashlib
 import collections
-from jinja2 import Template
 import os
 from os.path import dirname, abspath, basename, splitext, isfile, join
 import logging
 from edi.lib.helpers import (get_user, get_user_gid, get_user_uid,
-                             get_hostname, get_edi_plugin_directory, FatalError)
+                             get_hostname, get_edi_plugin_directory, FatalError,
+                             get_edi_cache_directory, create_user_directory, chown_to_user_if_root)
 from edi.lib.versionhelpers import get_edi_version, get_stripped_version
 from edi.lib.shellhelpers import get_user_environment_variable
+from edi.lib.yamlhelpers import safe_load, safe_dump, LazyDump
+from edi.lib.jinja2helpers import render_template
+from edi.lib.filehelpers import write_file_atomically
 from packaging.version import Version
 
 
+_base_dictionary = None
+
+
 def get_base_dictionary():
+    """
+    Get the dictionary with the host and user specific values.
+    The values get collected once per process - use invalidate_base_dictionary to enforce a refresh.
+    :return: a copy of the dictionary that can be modified by the caller
+    """
+    global _base_dictionary
+    if _base_dictionary is None:
+        _base_dictionary = _collect_base_dictionary()
+    return dict(_base_dictionary)
+
+
+def invalidate_base_dictionary():
+    global _base_dictionary
+    _base_dictionary = None
+
+
+def _collect_base_dictionary():
     base_dict = {}
     current_user_name = get_user()
     base_dict["edi_current_user_name"] = current_user_name
@@ -56,7 +80,7 @@ class ConfigurationParser():
     _configurations = {}
 
     def dump(self):
-        return yaml.dump(self._get_config(), default_flow_style=False)
+        return safe_dump(self._get_config(), default_flow_style=False)
 
     def get_project_name(self):
         return self.config_id
@@ -77,6 +101,9 @@ class ConfigurationParser():
     def get_bootstrap_repository_key(self):
         return self._get_bootstrap_item("repository_key", None)
 
+    def get_bootstrap_repository_key_fingerprint(self):
+        return self._get_bootstrap_item("repository_key_fingerprint", None)
+
     def get_qemu_repository(self):
         return self._get_qemu_item("repository", None)
 
@@ -86,9 +113,24 @@ class ConfigurationParser():
     def get_qemu_repository_key(self):
         return self._get_qemu_item("repository_key", None)
 
+    def get_qemu_repository_key_fingerprint(self):
+        return self._get_qemu_item("repository_key_fingerprint", None)
+
     def get_compression(self):
         return self._get_general_item("edi_compression", "xz")
 
+    def get_compression_threads(self):
+        """
+        :return: the number of threads used for the compression of images (0 means one per core)
+        """
+        return int(self._get_general_item("edi_compression_threads", 0))
+
+    def get_artifact_store_size(self):
+        """
+        :return: the maximum size of the artifact store in bytes (configured in megabytes)
+        """
+        return int(self._get_general_item("edi_artifact_store_size", 10240)) * 1024 * 1024
+
     def get_ordered_path_items(self, section):
         citems = self._get_config().get(section, {})
         ordered_items = collections.OrderedDict(sorted(citems.items()))
@@ -127,25 +169,27 @@ class ConfigurationParser():
         self.config_directory = dirname(abspath(base_config_file.name))
         self.config_id = splitext(basename(base_config_file.name))[0]
         if not ConfigurationParser._configurations.get(self.config_id):
-            logging.info(("Load time dictionary:\n{}"
-                          ).format(yaml.dump(self._get_load_time_dictionary(),
-                                             default_flow_style=False)))
+            logging.info("Load time dictionary:\n%s", LazyDump(self._get_load_time_dictionary()))
             logging.info(("Using base configuration file '{0}'"
                           ).format(base_config_file.name))
-            base_config = self._get_base_config(base_config_file)
-            global_config = self._get_overlay_config(base_config_file,
-                                                     "global")
-            system_config = self._get_overlay_config(base_config_file,
-                                                     get_hostname())
-            user_config = self._get_overlay_config(base_config_file,
-                                                   get_user())
-
-            merge_1 = self._merge_configurations(base_config, global_config)
-            merge_2 = self._merge_configurations(merge_1, system_config)
-            merged_config = self._merge_configurations(merge_2, user_config)
+            cache_file = self._get_cache_file(base_config_file)
+            merged_config = self._load_cached_configuration(cache_file)
+            if merged_config is None:
+                base_config = self._get_base_config(base_config_file)
+                global_config = self._get_overlay_config(base_config_file,
+                                                         "global")
+                system_config = self._get_overlay_config(base_config_file,
+                                                         get_hostname())
+                user_config = self._get_overlay_config(base_config_file,
+                                                       get_user())
+
+                merge_1 = self._merge_configurations(base_config, global_config)
+                merge_2 = self._merge_configurations(merge_1, system_config)
+                merged_config = self._merge_configurations(merge_2, user_config)
+                self._store_cached_configuration(cache_file, merged_config)
 
             ConfigurationParser._configurations[self.config_id] = merged_config
-            logging.info("Merged configuration:\n{0}".format(self.dump()))
+            logging.info("Merged configuration:\n%s", LazyDump(self._get_config()))
 
             self._verify_version_compatibility()
 
@@ -161,13 +205,76 @@ class ConfigurationParser():
         return ConfigurationParser._configurations.get(self.config_id, {})
 
     def _parse_jina2_file(self, config_file):
-        template = Template(config_file.read())
-        return template.render(self._get_load_time_dictionary())
+        return render_template(config_file.read(), self._get_load_time_dictionary())
 
     def _get_base_config(self, config_file):
-        return yaml.load(self._parse_jina2_file(config_file)) or {}
+        return safe_load(self._parse_jina2_file(config_file)) or {}
+
+    def _get_cache_file(self, base_config_file):
+        """
+        Get the cache file of the merged configuration. The file name depends on the content
+        of all the input files and on the load time dictionary.
+        :return: the path of the cache file or None if the configuration can not be cached
+        """
+        config_files = [base_config_file.name]
+        for overlay_name in ["global", get_hostname(), get_user()]:
+            config_files.append(self._get_overlay_file(base_config_file, overlay_name))
+
+        h = hashlib.sha256()
+        h.update(get_edi_version().encode())
+        try:
+            h.update(json.dumps(self._get_load_time_dictionary(), sort_keys=True).encode())
+            for config_file in config_files:
+                if config_file:
+                    with open(config_file, mode='rb') as f:
+                        h.update(hashlib.sha256(f.read()).digest())
+                else:
+                    h.update(b'-')
+        except (OSError, TypeError) as error:
+            logging.debug("The configuration can not be cached ({}).".format(error))
+            return None
+
+        return join(get_edi_cache_directory(), "configurations", "{}.json".format(h.hexdigest()))
+
+    @staticmethod
+    def _load_cached_configuration(cache_file):
+        if not cache_file or not isfile(cache_file):
+            return None
+
+        try:
+            with open(cache_file, encoding="UTF-8", mode="r") as f:
+                merged_config = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        logging.info("Using cached configuration '{}'.".format(cache_file))
+        return merged_config
 
-    def _get_overlay_config(self, base_config_file, overlay_name):
+    @staticmethod
+    def _store_cached_configuration(cache_file, merged_config):
+        if not cache_file:
+            return
+
+        try:
+            serialized_config = json.dumps(merged_config)
+        except (TypeError, ValueError):
+            logging.debug("The merged configuration can not be serialized.")
+            return
+
+        # e.g. integer keys or dates would not survive the round trip
+        if json.loads(serialized_config) != merged_config:
+            logging.debug("The merged configuration does not survive a json round trip.")
+            return
+
+        try:
+            create_user_directory(dirname(cache_file))
+            write_file_atomically(cache_file, serialized_config)
+            chown_to_user_if_root(cache_file)
+        except OSError as error:
+            logging.warning("Unable to cache the merged configuration ({}).".format(error))
+
+    @staticmethod
+    def _get_overlay_file(base_config_file, overlay_name):
         fname, extension = splitext(basename(base_config_file.name))
         directory = dirname(base_config_file.name)
         overlay_file = "{0}.{1}{2}".format(fname, overlay_name,
@@ -175,10 +282,17 @@ class ConfigurationParser():
         overlay = join(directory, "configuration", "overlay",
                        overlay_file)
         if isfile(overlay) and os.access(overlay, os.R_OK):
+            return overlay
+        else:
+            return None
+
+    def _get_overlay_config(self, base_config_file, overlay_name):
+        overlay = self._get_overlay_file(base_config_file, overlay_name)
+        if overlay:
             with open(overlay, encoding="UTF-8", mode="r") as config_file:
                 logging.info(("Using overlay configuration file '{0}'"
                               ).format(config_file.name))
-                return yaml.load(self._parse_jina2_file(config_file))
+                return safe_load(self._parse_jina2_file(config_file))
         else:
             return {}
 
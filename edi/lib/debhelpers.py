@@ -27,46 +27,111 @@ import re
 import debian.deb822
 import hashlib
 import logging
+import shutil
+import concurrent.futures
 from aptsources.sourceslist import SourceEntry
-from edi.lib.helpers import FatalError
-from edi.lib.archivehelpers import decompress
-from edi.lib.keyhelpers import fetch_repository_key, build_keyring
+from edi.lib.helpers import FatalError, which, chown_to_user_if_root
+from edi.lib.packagesindex import PackagesIndex
+from edi.lib.dependencyresolver import DependencyResolver
+from edi.lib.archivehelpers import open_compressed
+from edi.lib.filehelpers import hash_file, copy_file
+from edi.lib.pdiffhelpers import parse_diff_index, get_patch_names, apply_ed_patch
+from edi.lib.keyhelpers import fetch_repository_key, get_keyring
+from edi.lib.metadatacache import MetadataCache
+from edi.lib.networkhelpers import get_http_session, default_http_timeout
 
 
 class PackageDownloader():
-    def __init__(self, repository=None, repository_key=None, architectures=None):
+    def __init__(self, repository=None, repository_key=None, architectures=None,
+                 session=None, timeout=default_http_timeout, cache_directory=None,
+                 compression_preference=None, repository_key_fingerprint=None):
         if not repository:
             raise FatalError('''Missing argument 'repository'.''')
         if not architectures:
             raise FatalError('''Missing (non empty) list 'architectures'.''')
         self._repository = repository
         self._repository_key = repository_key
+        self._repository_key_fingerprint = repository_key_fingerprint
         self._architectures = architectures
         self._source = SourceEntry(repository)
         self._source.uri = self._source.uri.rstrip('/')
-        self._compressions = ['gz', 'bz2', 'xz']
+        # local mirrors (file:// or plain directory) get accessed without http
+        if self._source.uri.startswith('/'):
+            self._local_root = self._source.uri
+        elif self._source.uri.startswith('file:'):
+            self._local_root = '/' + re.sub('^file:/*', '', self._source.uri)
+        else:
+            self._local_root = None
+        # e.g. ['xz', 'gz'] - by default the smallest available variant gets fetched
+        self._compression_preference = compression_preference
+        self._compressions = compression_preference or ['gz', 'bz2', 'xz']
+        self._acquire_by_hash = False
         self._checksum_algorithms = ['SHA512', 'SHA256'] # strongest first
+        # all archive elements get fetched over the same (keep-alive) session
+        self._session = session or get_http_session()
+        self._timeout = timeout
+        self._chunk_size = 64 * 1024
+        self._resume_attempts = 3
+        self._cache_directory = cache_directory
+        if cache_directory:
+            self._cache = MetadataCache(cache_directory, self._source.uri, self._source.dist)
+        else:
+            self._cache = None
 
     def _get_release_file_url(self, filename):
         return '{}/dists/{}/{}'.format(self._source.uri, self._source.dist, filename)
 
-    def _fetch_archive_element(self, url):
-        return self._fetch_archive_element_impl(url, check=True)
+    def _get_local_path(self, url):
+        """
+        :return: the path of the archive element within the local mirror or None if the repository is remote
+        """
+        if not self._local_root:
+            return None
+        return os.path.join(self._local_root, url[len(self._source.uri):].lstrip('/'))
+
+    def _request(self, url, headers=None, stream=False):
+        try:
+            return self._session.get(url, headers=headers, timeout=self._timeout, stream=stream)
+        except requests.exceptions.RequestException as error:
+            raise FatalError(("Unable to fetch archive element '{0}' ({1})."
+                              ).format(url, error))
+
+    def _fetch_release_element(self, filename, tempdir, check=True):
+        """
+        Fetches InRelease, Release or Release.gpg. A cached copy gets revalidated using a conditional request.
+        :return: a tuple (path, headers) where headers is None if the cached copy is still valid
+                 or (None, None) if the element is missing and check is False
+        """
+        url = self._get_release_file_url(filename)
+        local_path = self._get_local_path(url)
+        if local_path:
+            if os.path.isfile(local_path):
+                # nothing to fetch and nothing to cache
+                return local_path, None
+            elif check:
+                raise FatalError(("Unable to fetch archive element '{0}'."
+                                  ).format(url))
+            else:
+                return None, None
 
-    def _try_fetch_archive_element(self, url):
-        return self._fetch_archive_element_impl(url, check=False)
+        headers = self._cache.get_validators(filename) if self._cache else {}
+        req = self._request(url, headers=headers)
+
+        if req.status_code == 304 and headers:
+            logging.info("Cached copy of '{}' is still valid.".format(url))
+            return self._cache.get_file(filename), None
 
-    @staticmethod
-    def _fetch_archive_element_impl(url, check=True):
-        req = requests.get(url)
         if req.status_code != 200:
             if check:
                 raise FatalError(("Unable to fetch archive element '{0}'."
                                   ).format(url))
             else:
-                return None
+                return None, None
 
-        return req.content
+        path = os.path.join(tempdir, filename)
+        with open(path, mode='wb') as f:
+            f.write(req.content)
+        return path, req.headers
 
     def _parse_release_file(self, release_file):
         with open(release_file) as file:
@@ -82,23 +147,68 @@ class PackageDownloader():
                                   ).format(' or '.join(a for a in self._checksum_algorithms),
                                            self._get_release_file_url('')))
 
-            packages_filter = ['{}/binary-{}/Packages.{}'.format(component, architecture, compression)
-                               for component in self._source.comps
-                               for architecture in self._architectures
-                               for compression in self._compressions]
-
-            package_files = [ element for element in section if element.get('name') in packages_filter ]
+            self._acquire_by_hash = main_content.get('Acquire-By-Hash', 'no') == 'yes'
+
+            # keep the checksums of the weaker algorithms too (e.g. pdiffs are based upon SHA256)
+            elements = {element.get('name'): element for element in section}
+            for algorithm in self._checksum_algorithms:
+                for other_element in main_content.get(algorithm, []):
+                    element = elements.get(other_element.get('name'))
+                    if element is not None:
+                        element.setdefault(algorithm.lower(), other_element.get(algorithm.lower()))
+
+            package_groups = []
+            for component in self._source.comps:
+                for architecture in self._architectures:
+                    packages_name = '{}/binary-{}/Packages'.format(component, architecture)
+                    variants = [element for element in section
+                                if element.get('name') in ['{}.{}'.format(packages_name, compression)
+                                                           for compression in self._compressions]]
+                    if variants:
+                        group = {'name': packages_name,
+                                 'variants': self._order_variants(variants),
+                                 'uncompressed': None,
+                                 'diff_index': None}
+                        for element in section:
+                            if element.get('name') == packages_name:
+                                group['uncompressed'] = element
+                            elif element.get('name') == '{}.diff/Index'.format(packages_name):
+                                group['diff_index'] = element
+                        package_groups.append(group)
+
+            return package_groups
+
+    def _order_variants(self, variants):
+        """
+        Orders the compressed variants of a Packages file: Either according to the
+        configured compression preference or - by default - the smallest variant first.
+        """
+        if self._compression_preference:
+            def sort_key(element):
+                return self._compressions.index(element['name'].rsplit('.', 1)[-1])
+        else:
+            def sort_key(element):
+                return int(element.get('size', 0))
 
-            return package_files
+        return sorted(variants, key=sort_key)
 
     def _verify_signature(self, homedir, keyring, signed_file, detached_signature=None):
-        cmd = ['gpg']
-        cmd.extend(['--homedir', homedir])
-        cmd.extend(['--weak-digest', 'SHA1'])
-        cmd.extend(['--weak-digest', 'RIPEMD160'])
-        cmd.extend(['--no-default-keyring', '--keyring', keyring])
-        cmd.extend(['--status-fd', '1'])
-        cmd.append('--verify')
+        # gpgv is a lot cheaper than gpg since it only verifies against the given keyring
+        if which('gpgv'):
+            cmd = ['gpgv']
+            cmd.extend(['--homedir', homedir])
+            cmd.extend(['--weak-digest', 'SHA1'])
+            cmd.extend(['--weak-digest', 'RIPEMD160'])
+            cmd.extend(['--keyring', keyring])
+            cmd.extend(['--status-fd', '1'])
+        else:
+            cmd = ['gpg']
+            cmd.extend(['--homedir', homedir])
+            cmd.extend(['--weak-digest', 'SHA1'])
+            cmd.extend(['--weak-digest', 'RIPEMD160'])
+            cmd.extend(['--no-default-keyring', '--keyring', keyring])
+            cmd.extend(['--status-fd', '1'])
+            cmd.append('--verify')
         if detached_signature:
             cmd.append(detached_signature)
         cmd.append(signed_file)
@@ -126,7 +236,7 @@ class PackageDownloader():
             else:
                 raise FatalError("Signature check for '{}' failed!".format(release_file_url))
 
-    def _verify_checksum(self, data, item):
+    def _get_checksum(self, item):
         all_algorithms = []
         for algorithm in self._checksum_algorithms:
             checksum = item.get(algorithm, None)
@@ -136,43 +246,263 @@ class PackageDownloader():
                 all_algorithms.append(algorithm.lower())
 
             if checksum:
-                h = hashlib.new(algorithm.lower())
-                h.update(data)
-                if h.hexdigest() != checksum:
-                    raise FatalError(("Checksum mismatch on repository item '\n{}' downloaded from '{}'."
-                                      ).format(item, self._source.uri))
-                else:
-                    return
+                return algorithm.lower(), checksum
 
         raise FatalError(("No checksum ({}) found for '\n{}' downloaded from '{}'."
                           ).format(' or '.join(a for a in all_algorithms),
                                    item, self._source.uri))
 
-    def _find_package_in_package_files(self, package_name, package_files):
-        downloaded_package_prefix = []
-        for package_file in package_files:
-            match = re.match('^(.*)Packages\.*([a-z2]{1,3})$', package_file['name'])
-            if not match or not len(match.groups()) <= 2:
-                raise FatalError('Error parsing package name string {}.'.format(package_file['name']))
+    def _fetch_archive_element_to_file(self, url, item, destination, check=True):
+        """
+        Streams an archive element into the destination file and verifies its checksum on the fly.
+        The data gets written to destination.part first: If the connection drops, the transfer
+        gets resumed using a http range request (also across runs).
+        :param url: the url of the archive element
+        :param item: the dictionary (Release or Packages entry) that contains the expected checksum
+        :param destination: the destination file
+        :param check: if True, a missing archive element is considered as fatal
+        :return: the destination file or None if the element is missing and check is False
+        """
+        algorithm, checksum = self._get_checksum(item)
+        local_path = self._get_local_path(url)
+        if local_path:
+            return self._copy_local_archive_element(local_path, item, destination, check)
+
+        part_file = '{}.part'.format(destination)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            h = hashlib.new(algorithm)
+            resumed = os.path.isfile(part_file)
+            try:
+                if not self._fetch_part(url, part_file, h):
+                    if check:
+                        raise FatalError(("Unable to fetch archive element '{0}'."
+                                          ).format(url))
+                    else:
+                        return None
+            except requests.exceptions.RequestException as error:
+                if attempt <= self._resume_attempts:
+                    logging.warning("Resuming the interrupted download of '{}' ({}).".format(url, error))
+                    continue
+                if os.path.isfile(part_file):
+                    # allow the next run to resume the download even without superuser privileges
+                    chown_to_user_if_root(part_file)
+                raise FatalError(("Unable to fetch archive element '{0}' ({1})."
+                                  ).format(url, error))
+
+            if h.hexdigest() == checksum:
+                os.replace(part_file, destination)
+                return destination
+
+            os.remove(part_file)
+            if resumed:
+                # the partial download might belong to an outdated version of the element
+                logging.warning("Checksum mismatch on '{}', restarting the download.".format(url))
+                continue
 
-            prefix = match.group(1).replace('/', '_')
+            raise FatalError(("Checksum mismatch on repository item '\n{}' downloaded from '{}'."
+                              ).format(item, self._source.uri))
 
-            if prefix in downloaded_package_prefix:
-                continue
+    def _copy_local_archive_element(self, local_path, item, destination, check):
+        if not os.path.isfile(local_path):
+            if check:
+                raise FatalError(("Unable to fetch archive element '{0}'."
+                                  ).format(local_path))
+            else:
+                return None
 
-            package_url = '{}/dists/{}/{}'.format(self._source.uri, self._source.dist, package_file['name'])
-            package_file_data = self._try_fetch_archive_element(package_url)
-            if package_file_data:
-                self._verify_checksum(package_file_data, package_file)
-                downloaded_package_prefix.append(prefix)
-                decompressed_package_data = decompress(package_file_data)
+        algorithm, checksum = self._get_checksum(item)
+        # verify the source first to avoid copying broken files
+        if hash_file(local_path, algorithm) != checksum:
+            raise FatalError(("Checksum mismatch on repository item '\n{}' found in '{}'."
+                              ).format(item, self._local_root))
+
+        return copy_file(local_path, destination)
+
+    def _fetch_part(self, url, part_file, h):
+        """
+        Fetches (the missing part of) an archive element into part_file.
+        :param h: the hash object that gets updated with the complete content of the element
+        :return: False if the element is not available
+        """
+        offset = os.path.getsize(part_file) if os.path.isfile(part_file) else 0
+        headers = {'Range': 'bytes={}-'.format(offset)} if offset else None
+
+        req = self._session.get(url, headers=headers, timeout=self._timeout, stream=True)
+        try:
+            if req.status_code == 416 and offset:
+                # the partial download is already complete
+                self._update_hash(part_file, h)
+                return True
+
+            if req.status_code == 206 and offset:
+                self._update_hash(part_file, h)
+                mode = 'ab'
+            elif req.status_code == 200:
+                if offset:
+                    logging.info("Server does not support resuming the download of '{}'.".format(url))
+                mode = 'wb'
+            else:
+                return False
+
+            with open(part_file, mode=mode) as f:
+                for chunk in req.iter_content(chunk_size=self._chunk_size):
+                    h.update(chunk)
+                    f.write(chunk)
+            return True
+        finally:
+            req.close()
+
+    def _update_hash(self, file_name, h):
+        with open(file_name, mode='rb') as f:
+            for chunk in iter(lambda: f.read(self._chunk_size), b''):
+                h.update(chunk)
+
+    def _fetch_index_file(self, item, destination, check=True):
+        """
+        Fetches a file listed in the Release file. If the repository supports it,
+        the file gets fetched from its by-hash location first to avoid races with mirror updates.
+        """
+        if self._acquire_by_hash:
+            algorithm, checksum = self._get_checksum(item)
+            by_hash_name = '{}/by-hash/{}/{}'.format(os.path.dirname(item['name']), algorithm.upper(), checksum)
+            if self._fetch_archive_element_to_file(self._get_release_file_url(by_hash_name), item,
+                                                   destination, check=False):
+                return destination
+
+        return self._fetch_archive_element_to_file(self._get_release_file_url(item['name']), item,
+                                                   destination, check=check)
+
+    def _get_cached_index(self, packages_name):
+        index_name = '{}.index'.format(packages_name)
+        if (self._cache and
+                self._cache.get_file(packages_name) and
+                self._cache.get_checksum(index_name) == self._cache.get_checksum(packages_name) and
+                PackagesIndex.is_valid(self._cache.get_file(index_name))):
+            return PackagesIndex(self._cache.get_file(packages_name), self._cache.get_file(index_name))
+        else:
+            return None
+
+    def _store_index(self, index, packages_name, algorithm, checksum):
+        if self._cache:
+            packages_file = self._cache.store(packages_name, index.get_packages_file(),
+                                              algorithm=algorithm, checksum=checksum)
+            index_file = self._cache.store('{}.index'.format(packages_name), index.get_index_file(),
+                                           algorithm=algorithm, checksum=checksum)
+            return PackagesIndex(packages_file, index_file)
+        else:
+            return index
+
+    def _get_current_cached_index(self, group):
+        """
+        Provides the cached index of a Packages file as long as it is based on a variant
+        (or the uncompressed file) that is still listed with the same checksum in the Release file.
+        :return: a PackagesIndex or None
+        """
+        index = self._get_cached_index(group['name'])
+        if not index:
+            return None
+
+        # compare using the algorithm of the cached checksum (e.g. SHA256 for pdiff updates)
+        cached_algorithm, cached_checksum = self._cache.get_checksum(group['name'])
+        candidates = group['variants'] + [group['uncompressed']] if group['uncompressed'] else group['variants']
+        for candidate in candidates:
+            if cached_checksum and candidate.get(cached_algorithm) == cached_checksum:
+                logging.info("Using cached index of '{}'.".format(group['name']))
+                return index
 
-                with tempfile.SpooledTemporaryFile() as f:
-                    f.write(decompressed_package_data)
-                    f.seek(0)
-                    for section in debian.deb822.Packages.iter_paragraphs(f):
-                        if section['Package'] == package_name:
-                            return section
+        return None
+
+    def _update_cached_index(self, group, tempdir):
+        """
+        Brings an outdated cached Packages file up to date by applying the pdiffs
+        listed in Packages.diff/Index.
+        :return: a PackagesIndex or None if the update is not possible
+        """
+        index = self._get_cached_index(group['name'])
+        if not index or not group['diff_index'] or not index.get_sha256():
+            return None
+
+        try:
+            diff_index_file = os.path.join(tempdir, group['diff_index']['name'].replace('/', '_'))
+            if not self._fetch_index_file(group['diff_index'], diff_index_file, check=False):
+                return None
+
+            diff_index = parse_diff_index(diff_index_file)
+            patch_names = get_patch_names(diff_index, index.get_sha256())
+            if patch_names is None:
+                logging.info("No pdiff path available for '{}'.".format(group['name']))
+                return None
+            elif not patch_names:
+                logging.info("Cached '{}' is up to date.".format(group['name']))
+                return index
+
+            patched_file = os.path.join(tempdir, group['name'].replace('/', '_'))
+            shutil.copyfile(index.get_packages_file(), patched_file)
+            for patch_name in patch_names:
+                download_checksum, download_name = diff_index['downloads'][patch_name]
+                patch_item = {'name': '{}.diff/{}'.format(group['name'], download_name),
+                              'sha256': download_checksum}
+                patch_file = os.path.join(tempdir, 'patch_{}'.format(download_name))
+                self._fetch_index_file(patch_item, patch_file)
+                with open_compressed(patch_file) as f:
+                    patch = f.read()
+
+                if hashlib.sha256(patch).hexdigest() != diff_index['patches'].get(patch_name):
+                    raise FatalError("Checksum mismatch on pdiff '{}'.".format(patch_name))
+
+                with open(patched_file, mode='rb') as source, open('{}.new'.format(patched_file), mode='wb') as dest:
+                    apply_ed_patch(source, patch, dest)
+                os.replace('{}.new'.format(patched_file), patched_file)
+
+            updated_index = PackagesIndex.create(patched_file)
+            if updated_index.get_sha256() != diff_index['current']:
+                raise FatalError("Checksum mismatch on patched '{}'.".format(group['name']))
+        except FatalError as error:
+            logging.warning("Unable to apply pdiffs to '{}' ({}).".format(group['name'], error.message))
+            return None
+
+        logging.info("Applied {} pdiff(s) to '{}'.".format(len(patch_names), group['name']))
+        return self._store_index(updated_index, group['name'], 'sha256', diff_index['current'])
+
+    def _fetch_package_index(self, package_file, packages_name, tempdir):
+        """
+        Fetches a (compressed) Packages file and builds its index.
+        :return: a PackagesIndex or None if the Packages file is not available
+        """
+        compressed_file = os.path.join(tempdir, package_file['name'].replace('/', '_'))
+        if not self._fetch_index_file(package_file, compressed_file, check=False):
+            return None
+
+        index = PackagesIndex.build(compressed_file, os.path.join(tempdir, packages_name.replace('/', '_')))
+        os.remove(compressed_file)
+
+        algorithm, checksum = self._get_checksum(package_file)
+        return self._store_index(index, packages_name, algorithm, checksum)
+
+    def _get_package_indices(self, package_groups, tempdir):
+        indices = []
+        for group in package_groups:
+            index = self._get_current_cached_index(group) or self._update_cached_index(group, tempdir)
+            # the preferred variant gets fetched - the others only serve as fallback if it is missing
+            for variant in group['variants']:
+                if index:
+                    break
+                index = self._fetch_package_index(variant, group['name'], tempdir)
+
+            if index:
+                indices.append(index)
+
+        return indices
+
+    @staticmethod
+    def _find_package(package_name, indices):
+        for index in indices:
+            package = index.lookup(package_name)
+            if package:
+                return package
 
         return None
 
@@ -180,49 +510,86 @@ class PackageDownloader():
         full_name = package['Filename']
         package_name = re.match('.*/(.*deb)', full_name).group(1)
         deb_url = '{}/{}'.format(self._source.uri, full_name)
-        package_data = self._fetch_archive_element(deb_url)
-        self._verify_checksum(package_data, package)
         package_file = os.path.join(dest, package_name)
-        with open(package_file, mode='wb') as f:
-            f.write(package_data)
-        return package_file
+        return self._fetch_archive_element_to_file(deb_url, package, package_file)
+
+    def _get_verified_indices(self, tempdir, package_names):
+        fetched_elements = []
+        signature_file = None
+        release_file, headers = self._fetch_release_element('InRelease', tempdir, check=False)
+
+        if release_file:
+            fetched_elements.append(('InRelease', release_file, headers))
+        else:
+            release_file, headers = self._fetch_release_element('Release', tempdir)
+            fetched_elements.append(('Release', release_file, headers))
+            if self._repository_key:
+                signature_file, headers = self._fetch_release_element('Release.gpg', tempdir)
+                fetched_elements.append(('Release.gpg', signature_file, headers))
+
+        if self._repository_key:
+            key_data = fetch_repository_key(self._repository_key, session=self._session,
+                                            timeout=self._timeout, cache_directory=self._cache_directory,
+                                            fingerprint=self._repository_key_fingerprint)
+            keyring = get_keyring(key_data, cache_directory=self._cache_directory)
+            self._verify_signature(tempdir, keyring, release_file, signature_file)
+        else:
+            logging.warning('Warning: Package {} will get downloaded without verification!'.format(
+                ', '.join(package_names)))
+
+        if self._cache:
+            # only verified release elements get cached
+            for name, path, headers in fetched_elements:
+                if headers is not None:
+                    self._cache.store(name, path, headers=headers)
+
+        package_groups = self._parse_release_file(release_file)
+        return self._get_package_indices(package_groups, tempdir)
 
     def download(self, package_name=None, dest='/tmp'):
         if not package_name:
             raise FatalError('Missing argument package_name!')
 
+        return self.download_packages(package_names=[package_name], dest=dest)[0]
+
+    def download_packages(self, package_names=None, dest='/tmp', max_workers=4,
+                          resolve_dependencies=False, exclude=None):
+        """
+        Downloads multiple packages using a single verified set of repository metadata.
+        :param package_names: the list of the packages that shall get downloaded
+        :param dest: the destination folder
+        :param max_workers: the maximum number of concurrent downloads
+        :param resolve_dependencies: if True, the Pre-Depends and Depends of the packages get downloaded too
+        :param exclude: dependencies that shall not get downloaded (e.g. because they are already available)
+        :return: the list of the downloaded files (same order as package_names followed by the dependencies)
+        """
+        if not package_names:
+            raise FatalError('Missing (non empty) list package_names!')
+
+        unique_package_names = []
+        for package_name in package_names:
+            if package_name not in unique_package_names:
+                unique_package_names.append(package_name)
+
         with tempfile.TemporaryDirectory() as tempdir:
-            inrelease_data = self._try_fetch_archive_element(self._get_release_file_url('InRelease'))
-            release_file = os.path.join(tempdir, 'InRelease')
-            signature_file = None
+            indices = self._get_verified_indices(tempdir, unique_package_names)
 
-            if inrelease_data:
-                with open(release_file, mode='wb') as f:
-                    f.write(inrelease_data)
-            else:
-                release_file = os.path.join(tempdir, 'Release')
-                signature_file = os.path.join(tempdir, 'Release.gpg')
+            requested_packages = {}
+            for package_name in unique_package_names:
+                requested_packages[package_name] = self._find_package(package_name, indices)
 
-                release_data = self._fetch_archive_element(self._get_release_file_url('Release'))
-                with open(release_file, mode='wb') as f:
-                    f.write(release_data)
-                if self._repository_key:
-                    signature_data = self._fetch_archive_element(self._get_release_file_url('Release.gpg'))
-                    with open(signature_file, mode='wb') as f:
-                        f.write(signature_data)
+            missing_packages = [name for name in unique_package_names if not requested_packages[name]]
+            if missing_packages:
+                raise FatalError(("Package '{}' not found in repository '{}'."
+                                  ).format(', '.join(missing_packages), self._source.uri))
 
-            if self._repository_key:
-                key_data = fetch_repository_key(self._repository_key)
-                keyring = build_keyring(tempdir, 'trusted.gpg', key_data)
-                self._verify_signature(tempdir, keyring, release_file, signature_file)
+            if resolve_dependencies:
+                resolver = DependencyResolver(indices, exclude=exclude)
+                packages = resolver.resolve(unique_package_names)
+                logging.info("Resolved packages: {}.".format(', '.join(p['Package'] for p in packages)))
             else:
-                logging.warning('Warning: Package {} will get downloaded without verification!'.format(package_name))
+                packages = [requested_packages[name] for name in unique_package_names]
 
-            package_files = self._parse_release_file(release_file)
-            requested_package = self._find_package_in_package_files(package_name, package_files)
-            if not requested_package:
-                raise FatalError(("Package '{}' not found in repository '{}'."
-                                  ).format(package_name, self._source.uri))
-            else:
-                result = self._download_package(requested_package, dest)
-                return result
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self._download_package, package, dest) for package in packages]
+                return [future.result() for future in futures]
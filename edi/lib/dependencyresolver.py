@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from collections import deque
+from functools import cmp_to_key
+from debian.debian_support import version_compare
+from edi.lib.helpers import FatalError
+
+
+_version_operators = {
+    '<<': lambda result: result < 0,
+    '<=': lambda result: result <= 0,
+    '=': lambda result: result == 0,
+    '>=': lambda result: result >= 0,
+    '>>': lambda result: result > 0,
+    # deprecated operators
+    '<': lambda result: result <= 0,
+    '>': lambda result: result >= 0,
+}
+
+
+def is_version_satisfied(version, constraint):
+    """
+    :param version: a Debian version string
+    :param constraint: a tuple (operator, version) or None
+    :return: True if the version satisfies the constraint
+    """
+    if not constraint:
+        return True
+
+    operator, required_version = constraint
+    check = _version_operators.get(operator)
+    if not check:
+        raise FatalError("Unknown version operator '{}'.".format(operator))
+    return check(version_compare(version, required_version))
+
+
+class DependencyResolver():
+    """
+    Computes the closure of the Pre-Depends and Depends relations of a set of packages
+    based upon one or more PackagesIndex instances.
+    The resolver picks the first alternative that can be satisfied and - among multiple
+    versions of a package - the highest version that satisfies the version constraint.
+    """
+
+    _relations = ['pre-depends', 'depends']
+
+    def __init__(self, indices, exclude=None):
+        """
+        :param indices: a list of PackagesIndex instances
+        :param exclude: packages that shall not become part of the closure (e.g. because they are already available)
+        """
+        self._indices = indices
+        self._exclude = set(exclude or [])
+
+    def resolve(self, package_names):
+        """
+        :param package_names: the packages that shall get resolved
+        :return: the paragraphs (debian.deb822.Packages) of the requested packages followed by their dependencies
+        """
+        selected = {}
+        order = []
+        queue = deque()
+
+        for package_name in package_names:
+            package = self._get_best_candidate(package_name, None)
+            if not package:
+                raise FatalError("Package '{}' not found.".format(package_name))
+            self._select(package, selected, order, queue)
+
+        while queue:
+            package = queue.popleft()
+            for relation in self._relations:
+                for alternatives in package.relations.get(relation, []):
+                    if self._is_satisfied(alternatives, selected):
+                        continue
+
+                    candidate = self._find_candidate(alternatives, selected)
+                    if not candidate:
+                        for alternative in alternatives:
+                            conflicting_package = selected.get(alternative.get('name'))
+                            if conflicting_package:
+                                raise FatalError(("Unable to resolve the dependency '{}' of package '{}': "
+                                                  "version '{}' of package '{}' has already been selected."
+                                                  ).format(self._format_alternatives(alternatives),
+                                                           package['Package'], conflicting_package['Version'],
+                                                           conflicting_package['Package']))
+
+                        raise FatalError(("Unable to resolve the dependency '{}' of package '{}'."
+                                          ).format(self._format_alternatives(alternatives), package['Package']))
+
+                    self._select(candidate, selected, order, queue)
+
+        return [selected[name] for name in order]
+
+    @staticmethod
+    def _select(package, selected, order, queue):
+        if package['Package'] not in selected:
+            logging.debug("Adding package '{}' ({}).".format(package['Package'], package['Version']))
+            selected[package['Package']] = package
+            order.append(package['Package'])
+            queue.append(package)
+
+    def _is_satisfied(self, alternatives, selected):
+        for alternative in alternatives:
+            name = alternative.get('name')
+            constraint = alternative.get('version')
+            if name in self._exclude:
+                return True
+
+            package = selected.get(name)
+            if package and is_version_satisfied(package['Version'], constraint):
+                return True
+
+            for package in selected.values():
+                if self._provides(package, name, constraint):
+                    return True
+
+        return False
+
+    def _find_candidate(self, alternatives, selected):
+        for alternative in alternatives:
+            # only one version of a package can get installed
+            candidate = self._get_best_candidate(alternative.get('name'), alternative.get('version'),
+                                                 excluded_names=selected)
+            if candidate:
+                return candidate
+
+        return None
+
+    def _get_best_candidate(self, name, constraint, excluded_names=()):
+        candidates = []
+        for index in self._indices:
+            candidates.extend([package for package in index.lookup_all(name)
+                               if is_version_satisfied(package['Version'], constraint) and
+                               package['Package'] not in excluded_names])
+
+        if not candidates:
+            for index in self._indices:
+                candidates.extend([package for package in index.lookup_providers(name)
+                                   if self._provides(package, name, constraint) and
+                                   package['Package'] not in excluded_names])
+
+        if not candidates:
+            return None
+
+        return max(candidates, key=cmp_to_key(lambda a, b: version_compare(a['Version'], b['Version'])))
+
+    @staticmethod
+    def _provides(package, name, constraint):
+        for provided in package.relations.get('provides', []):
+            for item in provided:
+                if item.get('name') != name:
+                    continue
+                if not constraint:
+                    return True
+                # a versioned dependency can only be satisfied by a versioned provides
+                provided_version = item.get('version')
+                if provided_version and is_version_satisfied(provided_version[1], constraint):
+                    return True
+        return False
+
+    @staticmethod
+    def _format_alternatives(alternatives):
+        formatted = []
+        for alternative in alternatives:
+            if alternative.get('version'):
+                formatted.append('{} ({} {})'.format(alternative.get('name'), *alternative.get('version')))
+            else:
+                formatted.append(alternative.get('name'))
+        return ' | '.join(formatted)
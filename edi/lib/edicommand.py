@@ -23,8 +23,14 @@ from edi.lib.commandfactory import CommandFactory
 from edi.lib.configurationparser import ConfigurationParser
 import argparse
 import os
-from edi.lib.helpers import FatalError
+import re
+import json
+import hashlib
+import logging
+from edi.lib.helpers import FatalError, chown_to_user_if_root, get_edi_cache_directory, which
 from edi.lib.shellhelpers import run
+from edi.lib.filehelpers import hash_file
+from edi.lib.artifactstore import ArtifactStore
 from edi.lib.commandfactory import get_sub_commands, get_command
 
 
@@ -62,8 +68,115 @@ class EdiCommand(metaclass=CommandFactory):
             command().clean(config_file)
 
     def _setup_parser(self, config_file):
+        self.config_file = config_file
         self.config = ConfigurationParser(config_file)
 
+    def get_fingerprint(self, config_file):
+        """
+        Get the fingerprint of the inputs of the command without running the command.
+        :return: the fingerprint or None if the command does not produce an artifact
+        """
+        self._setup_parser(config_file)
+        return self._get_fingerprint()
+
+    def _get_fingerprint_inputs(self):
+        """
+        Get the inputs that influence the result of the command (including the fingerprint of
+        the upstream command). Commands that support incremental rebuilds override this method.
+        :return: a json serializable dictionary or None
+        """
+        return None
+
+    def _get_fingerprint(self):
+        inputs = self._get_fingerprint_inputs()
+        if inputs is None:
+            return None
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _get_fingerprint_file(self):
+        return "{}.fingerprint".format(self._result())
+
+    def _is_up_to_date(self, fingerprint):
+        """
+        A result without a (matching) fingerprint is considered as outdated.
+        """
+        try:
+            with open(self._get_fingerprint_file(), encoding='utf-8', mode='r') as f:
+                recorded_fingerprint = f.read().strip()
+        except OSError:
+            logging.info("No fingerprint recorded for '{}'.".format(self._result()))
+            return False
+
+        if recorded_fingerprint != fingerprint:
+            logging.info("The inputs of '{}' have changed.".format(self._result()))
+            return False
+
+        return True
+
+    def _write_fingerprint(self, fingerprint):
+        fingerprint_file = self._get_fingerprint_file()
+        with open(fingerprint_file, encoding='utf-8', mode='w') as f:
+            f.write('{}\n'.format(fingerprint))
+        chown_to_user_if_root(fingerprint_file)
+
+    def _remove_fingerprint(self):
+        fingerprint_file = self._get_fingerprint_file()
+        if os.path.isfile(fingerprint_file):
+            os.remove(fingerprint_file)
+
+    def _get_artifact_store(self):
+        return ArtifactStore(get_edi_cache_directory(), self.config.get_artifact_store_size())
+
+    def _restore_artifact(self, fingerprint):
+        """
+        Materializes the result of the command from the artifact store.
+        :return: True if the artifact store contained the result
+        """
+        try:
+            if not self._get_artifact_store().fetch(fingerprint, self._result()):
+                return False
+        except OSError as error:
+            logging.warning("Unable to restore '{}' from the artifact store ({}).".format(self._result(), error))
+            return False
+
+        chown_to_user_if_root(self._result())
+        self._write_fingerprint(fingerprint)
+        return True
+
+    def _store_artifact(self, fingerprint):
+        # the artifact store is only an optimization - the result is already in place
+        try:
+            self._get_artifact_store().store(fingerprint, self._result())
+        except OSError as error:
+            logging.warning("Unable to add '{}' to the artifact store ({}).".format(self._result(), error))
+
+    def _remove_artifact(self):
+        """
+        Removes the result of the command from the artifact store so that the next run
+        builds it from scratch (e.g. to pick up updated packages of the repository).
+        Must be called before _remove_fingerprint.
+        """
+        fingerprints = {self._get_fingerprint()}
+        try:
+            with open(self._get_fingerprint_file(), encoding='utf-8', mode='r') as f:
+                # the workdir result might be based upon a former configuration
+                fingerprints.add(f.read().strip())
+        except OSError:
+            pass
+
+        store = self._get_artifact_store()
+        for fingerprint in fingerprints:
+            if fingerprint and re.match('^[0-9a-f]{64}$', fingerprint):
+                try:
+                    store.remove(fingerprint)
+                except OSError as error:
+                    logging.warning("Unable to remove '{}' from the artifact store ({}).".format(
+                        fingerprint, error))
+
+    @staticmethod
+    def _get_file_fingerprint(path):
+        return hash_file(path, 'sha256')
+
     @classmethod
     def _get_command_name(cls):
         return compose_command_name(cls)
@@ -116,11 +229,36 @@ class EdiCommand(metaclass=CommandFactory):
         cmd.append("tar")
         cmd.append("--numeric-owner")
         cmd.extend(["-C", datadir])
-        cmd.extend(["-acf", archive_path])
+        compressor = self._get_parallel_compressor()
+        if compressor:
+            cmd.extend(["-I", compressor])
+            cmd.extend(["-cf", archive_path])
+        else:
+            cmd.extend(["-acf", archive_path])
         cmd.extend(os.listdir(datadir))
         run(cmd, sudo=True)
         return archive_path
 
+    # compression -> candidate (executable, command with thread count placeholder)
+    _parallel_compressors = {
+        'xz': [('xz', 'xz -T{}')],
+        'gz': [('pigz', 'pigz -p {}')],
+        'bz2': [('pbzip2', 'pbzip2 -p{}')],
+        'zst': [('pzstd', 'pzstd -p {}'), ('zstd', 'zstd -T{}')],
+    }
+
+    def _get_parallel_compressor(self):
+        """
+        Get a multi-threaded compressor that tar can pipe the archive through.
+        :return: the compressor command or None if tar shall pick a compressor on its own
+        """
+        threads = self.config.get_compression_threads() or os.cpu_count() or 1
+        for executable, command in self._parallel_compressors.get(self.config.get_compression(), []):
+            if which(executable):
+                return command.format(threads)
+
+        return None
+
     def _unpack_image(self, image, tempdir, subfolder="rootfs"):
         target_folder = os.path.join(tempdir, subfolder)
         os.makedirs(target_folder, exist_ok=True)
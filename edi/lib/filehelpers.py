@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2016 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import mmap
+import shutil
+import hashlib
+import fcntl
+import tempfile
+from contextlib import contextmanager
+
+
+def hash_file(file_name, algorithm):
+    """
+    Computes the checksum of a file. The file gets memory mapped to avoid copying its content.
+    :param file_name: the file
+    :param algorithm: a hashlib algorithm name (e.g. sha256)
+    :return: the hexdigest
+    """
+    h = hashlib.new(algorithm)
+    with open(file_name, mode='rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                h.update(mapped_file)
+    return h.hexdigest()
+
+
+def copy_file(source, destination):
+    """
+    Copies a file using zero-copy os.sendfile if possible.
+    :return: the destination
+    """
+    with open(source, mode='rb') as src, open(destination, mode='wb') as dst:
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if not sent:
+                    break
+                offset += sent
+        except OSError:
+            # e.g. file systems that do not support sendfile
+            src.seek(offset)
+            dst.seek(offset)
+            shutil.copyfileobj(src, dst)
+    return destination
+
+
+def link_file(source, destination):
+    """
+    Makes the content of source available as destination. A hard link gets created if possible,
+    otherwise (e.g. if the files are located on different file systems) the file gets copied.
+    An existing destination gets replaced atomically.
+    :return: the destination
+    """
+    with atomic_file(destination) as temp_destination:
+        # the hard link needs to replace the placeholder reserved by atomic_file
+        os.remove(temp_destination)
+        try:
+            os.link(source, temp_destination)
+        except OSError:
+            copy_file(source, temp_destination)
+            shutil.copymode(source, temp_destination)
+    return destination
+
+
+@contextmanager
+def atomic_file(destination):
+    """
+    Yields a unique temporary path next to the destination. Once the block completes successfully
+    the temporary file atomically replaces the destination, otherwise it gets removed.
+    Concurrent writers of the same destination never share a temporary file and readers
+    never see partial data.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(destination)),
+                                     prefix='.{}.'.format(os.path.basename(destination)), suffix='.tmp')
+    os.close(fd)
+    try:
+        yield temp_path
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_file_atomically(destination, content, mode='w', encoding='utf-8'):
+    """
+    Writes content to destination using atomic_file.
+    :return: the destination
+    """
+    with atomic_file(destination) as temp_path:
+        with open(temp_path, mode=mode, encoding=None if 'b' in mode else encoding) as f:
+            f.write(content)
+    return destination
+
+
+@contextmanager
+def file_lock(lock_file):
+    """
+    Holds an exclusive lock on lock_file (blocks until the lock is available).
+    Serializes processes that share files (e.g. the download cache) for the duration of the block.
+    The lock file gets left behind on purpose: removing it would allow two processes to lock
+    different files of the same name.
+    """
+    with open(lock_file, mode='a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield lock_file
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
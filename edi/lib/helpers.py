@@ -25,6 +25,7 @@ from pwd import getpwnam
 import socket
 import logging
 import shutil
+from functools import lru_cache
 
 
 class Error(Exception):
@@ -70,14 +71,38 @@ def get_user():
         return "root"
 
 
+_host_facts = []
+
+
+def host_fact(func):
+    """
+    Decorator for functions that probe facts of the host that do not change during the lifetime of the process.
+    The result gets memoized (per argument) - use invalidate_host_facts to enforce new probes.
+    """
+    memoized_func = lru_cache(maxsize=None)(func)
+    _host_facts.append(memoized_func)
+    return memoized_func
+
+
+def invalidate_host_facts():
+    for fact in _host_facts:
+        fact.cache_clear()
+
+
+@host_fact
+def _get_passwd_entry(user):
+    return getpwnam(user)
+
+
 def get_user_uid():
-    return getpwnam(get_user()).pw_uid
+    return _get_passwd_entry(get_user()).pw_uid
 
 
 def get_user_gid():
-    return getpwnam(get_user()).pw_gid
+    return _get_passwd_entry(get_user()).pw_gid
 
 
+@host_fact
 def get_hostname():
     return socket.gethostname()
 
@@ -86,6 +111,14 @@ def get_edi_plugin_directory():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "plugins"))
 
 
+def get_edi_cache_directory():
+    """
+    Get the folder where edi keeps data that can be reused across runs and projects.
+    Hint: If edi is called using sudo, the cache of the calling user gets used.
+    """
+    return os.path.join(_get_passwd_entry(get_user()).pw_dir, ".cache", "edi")
+
+
 def copy_tree(src, dst):
     for item in os.listdir(src):
         s = os.path.join(src, item)
@@ -128,3 +161,30 @@ def require_executable(executable, hint):
 
 def chown_to_user(path):
     shutil.chown(path, get_user_uid(), get_user_gid())
+
+
+def create_user_directory(path):
+    """
+    Create a folder (including its missing parents) that is owned by the current user
+    even if edi is running with superuser privileges.
+    """
+    missing = []
+    current = os.path.abspath(path)
+    while not os.path.isdir(current):
+        missing.append(current)
+        current = os.path.dirname(current)
+
+    for folder in reversed(missing):
+        os.makedirs(folder, exist_ok=True)
+        chown_to_user_if_root(folder)
+
+    return path
+
+
+def chown_to_user_if_root(path):
+    """
+    Hand over a file or folder (e.g. within the cache of the user) to the current user
+    if edi is running with superuser privileges.
+    """
+    if os.getuid() == 0:
+        chown_to_user(path)
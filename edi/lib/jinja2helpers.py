@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2016 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import logging
+import jinja2
+from edi.lib.helpers import create_user_directory
+
+
+_environments = {
+    False: jinja2.Environment(),
+    # compact mode strips the whitespace around block tags and - unlike the default mode -
+    # preserves the trailing newline of the template (e.g. for configuration files)
+    True: jinja2.Environment(trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True),
+}
+# the environment name is part of the bytecode cache key
+_environment_names = {
+    False: 'default',
+    True: 'compact-v2',
+}
+_templates = {}
+_bytecode_cache = None
+
+
+def enable_bytecode_cache(directory):
+    """
+    Persist the compiled templates in directory so that they can be reused across runs.
+    """
+    global _bytecode_cache
+    try:
+        create_user_directory(directory)
+    except OSError as error:
+        logging.warning("Unable to enable the template cache in '{}' ({}).".format(directory, error))
+        return
+
+    _bytecode_cache = jinja2.FileSystemBytecodeCache(directory)
+
+
+def compile_template(source, compact=False):
+    """
+    Get the compiled template of source. A template gets compiled only once per process (and - if the
+    bytecode cache is enabled - once per content across runs).
+    :param source: the template string
+    :param compact: if True, the template gets compiled using trim_blocks, lstrip_blocks and keep_trailing_newline
+    :return: a jinja2.Template
+    """
+    name = '{}-{}'.format(_environment_names[compact], hashlib.sha256(source.encode('utf-8')).hexdigest())
+    template = _templates.get(name)
+    if template is None:
+        template = _compile(_environments[compact], name, source)
+        _templates[name] = template
+
+    return template
+
+
+def _compile(environment, name, source):
+    if not _bytecode_cache:
+        return environment.from_string(source)
+
+    bucket = _bytecode_cache.get_bucket(environment, name, None, source)
+    if bucket.code is None:
+        bucket.code = environment.compile(source)
+        _bytecode_cache.set_bucket(bucket)
+
+    return environment.template_class.from_code(environment, bucket.code, environment.make_globals(None), None)
+
+
+def render_template(source, dictionary, compact=False):
+    """
+    Renders the template string source using dictionary.
+    """
+    return compile_template(source, compact=compact).render(dictionary)
@@ -22,20 +22,92 @@
 import requests
 import gnupg
 import os
-from edi.lib.helpers import FatalError
+import hashlib
+import tempfile
+import logging
+from edi.lib.helpers import FatalError, create_user_directory, chown_to_user_if_root
+from edi.lib.networkhelpers import get_http_session, default_http_timeout
+from edi.lib.filehelpers import write_file_atomically
 
 
-def fetch_repository_key(key_url):
-    if key_url:
-        key_req = requests.get(key_url)
-        if key_req.status_code != 200:
-            raise FatalError(("Unable to fetch repository key '{0}'"
-                              ).format(key_url))
-
-        return key_req.text
-    else:
+def fetch_repository_key(key_url, session=None, timeout=default_http_timeout,
+                         cache_directory=None, fingerprint=None):
+    """
+    Fetches a repository key.
+    :param key_url: the url of the key
+    :param cache_directory: if given, the key gets fetched only once and is reused across runs and projects
+    :param fingerprint: if given, the key must have this fingerprint
+    :return: the key data or None if no key url is given
+    """
+    if not key_url:
         return None
 
+    key_file = None
+    if cache_directory:
+        key_file = os.path.join(cache_directory, 'keys',
+                                '{}.asc'.format(hashlib.sha256(key_url.encode()).hexdigest()))
+        if os.path.isfile(key_file):
+            with open(key_file, encoding='utf-8', mode='r') as f:
+                key_data = f.read()
+            if not fingerprint or _matches_fingerprint(key_data, fingerprint):
+                logging.info("Using cached repository key '{}'.".format(key_url))
+                return key_data
+            logging.warning("Cached repository key '{}' does not match the fingerprint '{}'.".format(
+                key_url, fingerprint))
+
+    key_data = _download_repository_key(key_url, session, timeout)
+
+    if fingerprint and not _matches_fingerprint(key_data, fingerprint):
+        raise FatalError(("The repository key '{0}' does not match the fingerprint '{1}'."
+                          ).format(key_url, fingerprint))
+
+    if key_file:
+        try:
+            create_user_directory(os.path.dirname(key_file))
+            write_file_atomically(key_file, key_data)
+            chown_to_user_if_root(key_file)
+        except OSError as error:
+            logging.warning("Unable to cache repository key '{}' ({}).".format(key_url, error))
+
+    return key_data
+
+
+def _download_repository_key(key_url, session, timeout):
+    try:
+        key_req = (session or get_http_session()).get(key_url, timeout=timeout)
+    except requests.exceptions.RequestException as error:
+        raise FatalError(("Unable to fetch repository key '{0}' ({1})"
+                          ).format(key_url, error))
+
+    if key_req.status_code != 200:
+        raise FatalError(("Unable to fetch repository key '{0}'"
+                          ).format(key_url))
+
+    return key_req.text
+
+
+def get_fingerprints(key_data):
+    """
+    :return: the fingerprints of the key(s) contained in key_data
+    """
+    with tempfile.TemporaryDirectory() as homedir:
+        gpg = gnupg.GPG(gnupghome=homedir)
+        gpg.encoding = 'utf-8'
+        return gpg.import_keys(key_data).fingerprints
+
+
+def _normalize_fingerprint(fingerprint):
+    return fingerprint.replace(' ', '').upper()
+
+
+def _matches_fingerprint(key_data, fingerprint):
+    """
+    Every key ends up in the keyring - therefore the key data must not contain
+    any key other than the pinned one.
+    """
+    fingerprints = set(_normalize_fingerprint(f) for f in get_fingerprints(key_data))
+    return fingerprints == {_normalize_fingerprint(fingerprint)}
+
 
 def build_keyring(tempdir, keyring_file, key_data):
     if key_data:
@@ -46,3 +118,55 @@ def build_keyring(tempdir, keyring_file, key_data):
         return keyring_file_path
     else:
         return None
+
+
+_keyrings = {}
+_keyring_directory = None
+
+
+def _get_keyring_directory(cache_directory):
+    global _keyring_directory
+    if cache_directory:
+        keyring_directory = os.path.join(cache_directory, 'keyrings')
+        try:
+            return create_user_directory(keyring_directory)
+        except OSError as error:
+            logging.warning("Unable to cache keyrings in '{}' ({}).".format(keyring_directory, error))
+
+    # without a cache the keyrings get reused for the lifetime of the process
+    if not _keyring_directory:
+        _keyring_directory = tempfile.TemporaryDirectory(prefix='edi-keyrings-')
+    return _keyring_directory.name
+
+
+def get_keyring(key_data, cache_directory=None):
+    """
+    Provides a keyring that contains the given key(s) and that can be used with gpgv.
+    The keyring gets built once per key and is reused afterwards.
+    :param key_data: the armored key(s)
+    :param cache_directory: if given, the keyring gets persisted across runs
+    :return: the path of the keyring or None if no key data is given
+    """
+    if not key_data:
+        return None
+
+    key_hash = hashlib.sha256(key_data.encode()).hexdigest()
+    keyring = _keyrings.get(key_hash)
+    if keyring and os.path.isfile(keyring):
+        return keyring
+
+    directory = _get_keyring_directory(cache_directory)
+    keyring = os.path.join(directory, '{}.gpg'.format(key_hash))
+    if not os.path.isfile(keyring):
+        logging.info("Importing repository key into keyring '{}'.".format(keyring))
+        with tempfile.TemporaryDirectory(dir=directory) as homedir:
+            temp_keyring = build_keyring(homedir, 'trusted.gpg', key_data)
+            if not os.path.isfile(temp_keyring):
+                raise FatalError("Unable to import repository key.")
+            os.replace(temp_keyring, keyring)
+
+        if cache_directory:
+            chown_to_user_if_root(keyring)
+
+    _keyrings[key_hash] = keyring
+    return keyring
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import re
+import json
+import logging
+from edi.lib.helpers import create_user_directory, chown_to_user_if_root
+from edi.lib.filehelpers import atomic_file, copy_file, write_file_atomically
+
+
+class MetadataCache():
+    """
+    Persistent cache for the metadata (Release and Packages files) of a Debian repository.
+    Every cached file is accompanied by a small json file that keeps the http validators
+    (ETag, Last-Modified) and the checksum of the verified download the file is based on.
+    """
+
+    def __init__(self, cache_directory, repository_uri, dist):
+        """
+        :param cache_directory: the root folder of the edi cache
+        :param repository_uri: the uri of the repository
+        :param dist: the distribution (e.g. stretch)
+        """
+        repository_id = re.sub('^[a-z]+:/+', '', '{}/dists/{}'.format(repository_uri.rstrip('/'), dist))
+        self._directory = os.path.join(cache_directory, 'repositories', self._escape(repository_id))
+
+    @staticmethod
+    def _escape(name):
+        return re.sub('[^a-zA-Z0-9.+~-]', '_', name)
+
+    def _get_path(self, name):
+        return os.path.join(self._directory, self._escape(name))
+
+    def _get_info_path(self, name):
+        return '{}.json'.format(self._get_path(name))
+
+    def _read_info(self, name):
+        try:
+            with open(self._get_info_path(name), encoding='utf-8', mode='r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get_file(self, name):
+        """
+        :param name: the name of the file relative to the dists folder (e.g. main/binary-amd64/Packages.xz)
+        :return: the path to the cached file or None if the file is not cached
+        """
+        path = self._get_path(name)
+        if os.path.isfile(path) and os.path.isfile(self._get_info_path(name)):
+            return path
+        else:
+            return None
+
+    def get_validators(self, name):
+        """
+        :return: the headers for a conditional request of the file
+        """
+        if not self.get_file(name):
+            return {}
+
+        info = self._read_info(name)
+        headers = {}
+        if info.get('etag'):
+            headers['If-None-Match'] = info.get('etag')
+        if info.get('last_modified'):
+            headers['If-Modified-Since'] = info.get('last_modified')
+        return headers
+
+    def get_checksum(self, name):
+        """
+        :return: the checksum (algorithm, hexdigest) of the verified download the cached file is based on
+        """
+        if not self.get_file(name):
+            return None, None
+
+        info = self._read_info(name)
+        return info.get('algorithm'), info.get('checksum')
+
+    def store(self, name, source, headers=None, algorithm=None, checksum=None):
+        """
+        Adds a verified file to the cache.
+        :param name: the name of the file relative to the dists folder
+        :param source: the verified file that shall be stored
+        :param headers: the response headers of the download
+        :param algorithm: the checksum algorithm used for the verification
+        :param checksum: the checksum of the verified download
+        :return: the path to the cached file or - if the cache is not writable - the source
+        """
+        headers = headers or {}
+        info = {'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'algorithm': algorithm,
+                'checksum': checksum}
+
+        path = self._get_path(name)
+        info_path = self._get_info_path(name)
+        try:
+            create_user_directory(self._directory)
+            # replace the files atomically so that concurrent runs never see partial data
+            with atomic_file(path) as temp_path:
+                copy_file(source, temp_path)
+            write_file_atomically(info_path, json.dumps(info))
+            chown_to_user_if_root(path)
+            chown_to_user_if_root(info_path)
+        except OSError as error:
+            logging.warning("Unable to cache repository metadata '{}' ({}).".format(name, error))
+            # a file without matching info must not get used
+            for stale_path in [info_path, path]:
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
+            return source
+
+        logging.info("Cached repository metadata '{}' in '{}'.".format(name, path))
+        return path
@@ -20,6 +20,9 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 import re
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 _hostname_regexp = ("^(([a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9\-]*"
                     "[a-zA-Z0-9])\.)*([A-Za-z0-9]|[A-Za-z0-9]"
@@ -31,3 +34,40 @@ def is_valid_hostname(name):
         return False
     else:
         return True
+
+
+# (connect timeout, read timeout) in seconds
+default_http_timeout = (15, 60)
+
+_shared_http_session = None
+
+
+def create_http_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """
+    Create a requests session that keeps the connections to a host alive.
+
+    :param pool_size: the maximum number of connections that get kept alive per host
+    :param retries: the number of retries upon connection errors or temporary server errors
+    :param backoff_factor: the backoff factor between the retries
+    :return: a new requests session
+    """
+    retry = Retry(total=retries, backoff_factor=backoff_factor,
+                  status_forcelist=[500, 502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_http_session():
+    """
+    Get the http session that is shared by all edi downloads of the current process.
+
+    :return: the shared requests session
+    """
+    global _shared_http_session
+    if _shared_http_session is None:
+        _shared_http_session = create_http_session()
+    return _shared_http_session
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+import json
+import hashlib
+import shutil
+import debian.deb822
+from edi.lib.helpers import FatalError
+from edi.lib.archivehelpers import (open_compressed, iter_paragraphs_with_offset,
+                                    get_paragraph_field, get_paragraph_value)
+
+
+_index_format_version = 3
+
+
+class _HashingReader():
+    def __init__(self, file_object, hash_object):
+        self._file_object = file_object
+        self._hash_object = hash_object
+
+    def __iter__(self):
+        for line in self._file_object:
+            self._hash_object.update(line)
+            yield line
+
+
+class PackagesIndex():
+    """
+    Random access by package name to the paragraphs of a decompressed Packages file.
+    The index maps every package name (and every virtual package name) to the byte
+    offsets of its (providing) paragraphs and gets stored next to the Packages file.
+    """
+
+    def __init__(self, packages_file, index_file=None):
+        """
+        :param packages_file: the decompressed Packages file
+        :param index_file: the index file (defaults to packages_file.index)
+        """
+        self._packages_file = packages_file
+        self._index_file = index_file or self.get_default_index_file(packages_file)
+        try:
+            with open(self._index_file, encoding='utf-8', mode='r') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as error:
+            raise FatalError("Unable to load package index '{}' ({}).".format(self._index_file, error))
+
+        if index.get('version') != _index_format_version:
+            raise FatalError("Outdated package index '{}'.".format(self._index_file))
+
+        self._packages = index.get('packages', {})
+        self._provides = index.get('provides', {})
+        self._sha256 = index.get('sha256')
+
+    @staticmethod
+    def get_default_index_file(packages_file):
+        return '{}.index'.format(packages_file)
+
+    @staticmethod
+    def is_valid(index_file):
+        try:
+            with open(index_file, encoding='utf-8', mode='r') as f:
+                return json.load(f).get('version') == _index_format_version
+        except (OSError, ValueError):
+            return False
+
+    @classmethod
+    def build(cls, compressed_file, packages_file, index_file=None):
+        """
+        Decompresses a Packages file and builds its index.
+        :param compressed_file: a gz, bz2 or xz compressed Packages file
+        :param packages_file: the destination of the decompressed Packages file
+        :param index_file: the destination of the index (defaults to packages_file.index)
+        :return: the index
+        """
+        with open_compressed(compressed_file) as source, open(packages_file, mode='wb') as destination:
+            shutil.copyfileobj(source, destination)
+
+        return cls.create(packages_file, index_file)
+
+    @classmethod
+    def create(cls, packages_file, index_file=None):
+        """
+        Builds the index of a decompressed Packages file.
+        :param packages_file: the decompressed Packages file
+        :param index_file: the destination of the index (defaults to packages_file.index)
+        :return: the index
+        """
+        index_file = index_file or cls.get_default_index_file(packages_file)
+
+        packages = {}
+        provides = {}
+        # the hash of the decompressed file allows incremental updates using pdiffs
+        h = hashlib.sha256()
+        with open(packages_file, mode='rb') as f:
+            for offset, paragraph in iter_paragraphs_with_offset(_HashingReader(f, h)):
+                name = get_paragraph_field(paragraph, 'Package')
+                if name:
+                    location = [offset, len(paragraph)]
+                    packages.setdefault(name, []).append(location)
+                    for virtual_package in cls._parse_provides(get_paragraph_value(paragraph, 'Provides')):
+                        provides.setdefault(virtual_package, []).append(location)
+
+        with open(index_file, encoding='utf-8', mode='w') as f:
+            json.dump({'version': _index_format_version, 'sha256': h.hexdigest(),
+                       'packages': packages, 'provides': provides}, f)
+
+        return cls(packages_file, index_file)
+
+    @staticmethod
+    def _parse_provides(value):
+        if not value:
+            return []
+        # e.g. "mail-transport-agent, foo:any (= 1.0)"
+        return [re.split('[\\s(:]', item.strip())[0] for item in value.split(',') if item.strip()]
+
+    def get_packages_file(self):
+        return self._packages_file
+
+    def get_index_file(self):
+        return self._index_file
+
+    def get_sha256(self):
+        """
+        :return: the SHA256 hash of the decompressed Packages file
+        """
+        return self._sha256
+
+    def __contains__(self, package_name):
+        return package_name in self._packages
+
+    def lookup(self, package_name):
+        """
+        :return: the first paragraph (debian.deb822.Packages) of the package or None
+        """
+        paragraphs = self.lookup_all(package_name, limit=1)
+        return paragraphs[0] if paragraphs else None
+
+    def lookup_all(self, package_name, limit=None):
+        """
+        :return: all paragraphs (debian.deb822.Packages) of the package (e.g. multiple versions)
+        """
+        return self._read_paragraphs(self._packages.get(package_name, [])[:limit])
+
+    def lookup_providers(self, virtual_package_name):
+        """
+        :return: all paragraphs (debian.deb822.Packages) of the packages that provide the virtual package
+        """
+        return self._read_paragraphs(self._provides.get(virtual_package_name, []))
+
+    def _read_paragraphs(self, locations):
+        result = []
+        if locations:
+            with open(self._packages_file, mode='rb') as f:
+                for offset, length in locations:
+                    f.seek(offset)
+                    result.append(debian.deb822.Packages(f.read(length)))
+        return result
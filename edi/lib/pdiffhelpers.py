@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+import debian.deb822
+from edi.lib.helpers import FatalError
+
+
+def parse_diff_index(index_file):
+    """
+    Parses a Packages.diff/Index file.
+    :param index_file: the path to the Index file
+    :return: a dictionary with the keys current (hash), history (list of (hash, name)),
+             patches (name -> hash), downloads (name -> (hash, file name)) and merged (bool)
+    """
+    with open(index_file, mode='rb') as f:
+        index = debian.deb822.Deb822(f.read())
+
+    current = index.get('SHA256-Current')
+    if not current:
+        raise FatalError("Unsupported pdiff index (missing SHA256-Current).")
+
+    def parse_lines(field):
+        result = []
+        for line in index.get(field, '').splitlines():
+            items = line.split()
+            if len(items) == 3:
+                result.append((items[0], items[2]))
+        return result
+
+    downloads = {}
+    for checksum, file_name in parse_lines('SHA256-Download'):
+        downloads[re.sub('\\.gz$', '', file_name)] = (checksum, file_name)
+
+    return {'current': current.split()[0],
+            'history': parse_lines('SHA256-History'),
+            'patches': {name: checksum for checksum, name in parse_lines('SHA256-Patches')},
+            'downloads': downloads,
+            'merged': index.get('X-Patch-Precedence') == 'merged'}
+
+
+def get_patch_names(diff_index, current_hash):
+    """
+    Determines the patches that need to be applied to get from the current state to the most recent state.
+    :param diff_index: a dictionary as returned by parse_diff_index
+    :param current_hash: the SHA256 hash of the file that shall get patched
+    :return: the list of the patch names (empty if the file is up to date) or None if no patch path exists
+    """
+    if current_hash == diff_index['current']:
+        return []
+
+    history_hashes = [checksum for checksum, _ in diff_index['history']]
+    if current_hash not in history_hashes:
+        return None
+
+    position = history_hashes.index(current_hash)
+    if diff_index['merged']:
+        # every merged patch leads directly to the most recent state
+        names = [diff_index['history'][position][1]]
+    else:
+        names = [name for _, name in diff_index['history'][position:]]
+
+    if not all(name in diff_index['downloads'] for name in names):
+        return None
+
+    return names
+
+
+_ed_command = re.compile(b'^(\\d+)(?:,(\\d+))?([acd])$')
+
+
+def parse_ed_patch(patch):
+    """
+    Parses an ed style patch as generated by diff --ed.
+    :param patch: the patch (bytes)
+    :return: list of commands (first, last, operation, lines)
+    """
+    commands = []
+    lines = iter(patch.splitlines(keepends=True))
+    for line in lines:
+        stripped = line.rstrip(b'\n')
+        if stripped in [b'', b'w']:
+            continue
+
+        match = _ed_command.match(stripped)
+        if not match:
+            raise FatalError("Unsupported ed command '{}'.".format(stripped.decode(errors='replace')))
+
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        operation = match.group(3).decode()
+        new_lines = []
+        if operation in ['a', 'c']:
+            for new_line in lines:
+                if new_line.rstrip(b'\n') == b'.':
+                    break
+                new_lines.append(new_line)
+            else:
+                raise FatalError("Unterminated ed command '{}'.".format(stripped.decode()))
+
+        commands.append((first, last, operation, new_lines))
+
+    return commands
+
+
+def apply_ed_patch(source, patch, destination):
+    """
+    Applies an ed style patch in a single streaming pass.
+    :param source: the binary file object of the original file
+    :param patch: the patch (bytes)
+    :param destination: the binary file object the patched data gets written to
+    """
+    # diff --ed emits the commands from the bottom to the top, all line numbers refer to the original file
+    def position(command):
+        first, _, operation, _ = command
+        return first + 0.5 if operation == 'a' else first
+
+    commands = sorted(parse_ed_patch(patch), key=position)
+    source_lines = iter(source)
+    line_number = 0
+
+    def copy_until(target):
+        nonlocal line_number
+        while line_number < target:
+            line = next(source_lines, None)
+            if line is None:
+                raise FatalError("The ed patch does not match the file that shall get patched.")
+            destination.write(line)
+            line_number += 1
+
+    for first, last, operation, new_lines in commands:
+        if operation == 'a':
+            copy_until(first)
+        else:
+            copy_until(first - 1)
+            for _ in range(last - first + 1):
+                if next(source_lines, None) is None:
+                    raise FatalError("The ed patch does not match the file that shall get patched.")
+                line_number += 1
+
+        for new_line in new_lines:
+            destination.write(new_line)
+
+    for line in source_lines:
+        destination.write(line)
@@ -22,12 +22,12 @@
 import os
 import logging
 import tempfile
-import yaml
 from codecs import open
 from edi.lib.helpers import chown_to_user
 from edi.lib.helpers import require_executable, get_user
 from edi.lib.shellhelpers import run
 from edi.lib.sharedfoldercoordinator import SharedFolderCoordinator
+from edi.lib.yamlhelpers import safe_dump, LazyDump
 
 
 class PlaybookRunner():
@@ -49,16 +49,13 @@ class PlaybookRunner():
             for name, path, extra_vars in playbook_list:
                 sfc = SharedFolderCoordinator(self.config)
                 extra_vars['edi_shared_folder_mountpoints'] = sfc.get_mountpoints()
-                logging.info(("Running playbook {} located in "
-                              "{} with extra vars:\n{}"
-                              ).format(name, path,
-                                       yaml.dump(extra_vars,
-                                                 default_flow_style=False)))
+                logging.info("Running playbook %s located in %s with extra vars:\n%s",
+                             name, path, LazyDump(extra_vars))
 
                 extra_vars_file = os.path.join(tempdir, ("extra_vars_{}"
                                                          ).format(name))
                 with open(extra_vars_file, encoding='utf-8', mode='w') as f:
-                    f.write(yaml.dump(extra_vars))
+                    f.write(safe_dump(extra_vars))
 
                 ansible_user = extra_vars.get("edi_config_management_user_name")
                 self._run_playbook(path, inventory, extra_vars_file, ansible_user)
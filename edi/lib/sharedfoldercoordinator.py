@@ -20,7 +20,7 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from jinja2 import Template
+from edi.lib.jinja2helpers import render_template, compile_template
 from edi.lib.helpers import FatalError
 from edi.lib.shellhelpers import run
 import os
@@ -115,7 +115,7 @@ class SharedFolderCoordinator():
         :return: list of profiles
         """
         if self._config.get_ordered_raw_items('shared_folders'):
-            return [Template(profile_privileged).render({})]
+            return [render_template(profile_privileged, {})]
         else:
             return []
 
@@ -126,8 +126,8 @@ class SharedFolderCoordinator():
         """
         shared_folders = self._config.get_ordered_raw_items('shared_folders')
         if shared_folders:
-            profiles = [Template(profile_privileged).render({})]
-            template = Template(profile_shared_folder)
+            profiles = [render_template(profile_privileged, {})]
+            template = compile_template(profile_shared_folder)
             for name, content, dict in shared_folders:
                 for item in ['folder', 'mountpoint']:
                     dict['shared_folder_{}'.format(item)] = self._get_mandatory_item(name, content, item)
@@ -22,7 +22,7 @@
 import logging
 import subprocess
 import os
-from edi.lib.helpers import get_user
+from edi.lib.helpers import get_user, host_fact
 from edi.lib import mockablerun
 
 _ADAPTIVE = -42
@@ -30,7 +30,7 @@ _ADAPTIVE = -42
 
 def run(popenargs, sudo=False, input=None, timeout=None,
         check=True, universal_newlines=True, stdout=_ADAPTIVE,
-        **kwargs):
+        log_output=True, **kwargs):
     """
     Small wrapper around subprocess.run().
     """
@@ -61,7 +61,7 @@ def run(popenargs, sudo=False, input=None, timeout=None,
                                       universal_newlines=universal_newlines,
                                       stdout=subprocess_stdout, **kwargs)
 
-    if (logging.getLogger().isEnabledFor(logging.INFO) and
+    if (log_output and logging.getLogger().isEnabledFor(logging.INFO) and
             subprocess_stdout is subprocess.PIPE):
         logging.info(result.stdout)
 
@@ -75,16 +75,46 @@ def get_chroot_cmd(rootfs):
     return cmd
 
 
+_user_environment = None
+
+
+def get_user_environment():
+    """
+    Get the environment of the user, not the one of root if edi is called using sudo.
+    The environment gets captured once per process - use invalidate_user_environment to enforce a refresh.
+    :return: a copy of the environment
+    """
+    return dict(_get_user_environment())
+
+
+def _get_user_environment():
+    global _user_environment
+    if _user_environment is None:
+        # the output might contain secrets and therefore does not get logged
+        result = run(["env", "-0"], stdout=subprocess.PIPE, check=False, log_output=False)
+        environment = {}
+        if result.returncode == 0:
+            for item in result.stdout.split('\0'):
+                name, separator, value = item.partition('=')
+                if separator:
+                    environment[name] = value
+        else:
+            logging.warning("Unable to capture the environment of the user.")
+        _user_environment = environment
+
+    return _user_environment
+
+
+def invalidate_user_environment():
+    global _user_environment
+    _user_environment = None
+
+
 def get_user_environment_variable(name, default=None):
-    # get the variable from the user, not from root if edi is called using sudo
-    cmd = ["printenv", name]
-    result = run(cmd, stdout=subprocess.PIPE, check=False)
-    if result.returncode == 0:
-        return result.stdout.strip('\n')
-    else:
-        return default
+    return _get_user_environment().get(name, default)
 
 
+@host_fact
 def get_debian_architecture():
     cmd = ['dpkg', '--print-architecture']
     return run(cmd, stdout=subprocess.PIPE).stdout.strip('\n')
\ No newline at end of file
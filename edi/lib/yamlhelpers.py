@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2016 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import yaml
+
+try:
+    # the libyaml based implementation is a lot faster
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+
+YAMLError = yaml.YAMLError
+
+
+def safe_load(stream):
+    """
+    Parses a yaml document (string or file object) without constructing arbitrary Python objects.
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def safe_dump(data, stream=None, **kwargs):
+    """
+    Serializes data that only consists of standard yaml types.
+    :return: the yaml document if no stream is given
+    """
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
+
+
+class LazyDump():
+    """
+    Defers the yaml serialization of data until it gets converted to a string.
+    Usage: logging.info("Data:\n%s", LazyDump(data)) - the data only gets serialized
+    if the log level is enabled.
+    """
+
+    def __init__(self, data, default_flow_style=False):
+        self._data = data
+        self._default_flow_style = default_flow_style
+
+    def __str__(self):
+        return safe_dump(self._data, default_flow_style=self._default_flow_style)
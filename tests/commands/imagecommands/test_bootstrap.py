@@ -19,6 +19,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
+from edi.commands.imagecommands import bootstrap
 from edi.commands.imagecommands.bootstrap import Bootstrap
 from tests.libtesting.fixtures.configfiles import config_files
 from tests.libtesting.helpers import get_command_parameter
@@ -26,47 +27,66 @@ import os
 import shutil
 import subprocess
 import requests_mock
-from edi.lib import mockablerun
+from edi.lib import mockablerun, edicommand
 
 
 _ADAPTIVE = -42
 
 
-def test_bootstrap(config_files, monkeypatch):
-    with open(config_files, "r") as main_file:
-        def fakegetuid():
-            return 0
+def setup_fake_environment(monkeypatch, cache_directory):
+    def fakecachedirectory():
+        return cache_directory
 
-        monkeypatch.setattr(os, 'getuid', fakegetuid)
+    monkeypatch.setattr(bootstrap, 'get_edi_cache_directory', fakecachedirectory)
+    monkeypatch.setattr(edicommand, 'get_edi_cache_directory', fakecachedirectory)
 
-        def fakechown(*_):
-            pass
+    def fakegetuid():
+        return 0
 
-        monkeypatch.setattr(shutil, 'chown', fakechown)
-
-        def fakerun(*popenargs, **kwargs):
-            if popenargs[0][0] == "chroot":
-                rootfs_path = popenargs[0][1]
-                if not os.path.exists(rootfs_path):
-                    os.mkdir(rootfs_path)
-            elif popenargs[0][0] == "debootstrap":
-                rootfs_path = popenargs[0][-2]
-                apt_dir = os.path.join(rootfs_path, 'etc', 'apt')
-                os.makedirs(apt_dir)
-                pass
-            elif popenargs[0][0] == "tar":
-                archive = get_command_parameter(popenargs[0], '-acf')
-                with open(archive, mode="w") as fakearchive:
-                    fakearchive.write("fake archive")
-            elif popenargs[0][-2] == "dpkg" and popenargs[0][-1] == "--print-architecture":
-                return subprocess.CompletedProcess("fakerun", 0, 'amd64')
+    monkeypatch.setattr(os, 'getuid', fakegetuid)
+
+    def fakechown(*_):
+        pass
+
+    monkeypatch.setattr(shutil, 'chown', fakechown)
+
+    tar_calls = []
+
+    def fakerun(*popenargs, **kwargs):
+        if popenargs[0][0] == "chroot":
+            rootfs_path = popenargs[0][1]
+            if not os.path.exists(rootfs_path):
+                os.mkdir(rootfs_path)
+        elif popenargs[0][0] == "debootstrap":
+            rootfs_path = popenargs[0][-2]
+            apt_dir = os.path.join(rootfs_path, 'etc', 'apt')
+            os.makedirs(apt_dir)
+            pass
+        elif popenargs[0][0] == "tar":
+            tar_calls.append(popenargs[0])
+            if '-I' in popenargs[0]:
+                assert get_command_parameter(popenargs[0], '-I').startswith('xz -T')
+                archive = get_command_parameter(popenargs[0], '-cf')
             else:
-                print('Passthrough: {}'.format(popenargs[0]))
-                return subprocess.run(*popenargs, **kwargs)
+                archive = get_command_parameter(popenargs[0], '-acf')
+            with open(archive, mode="w") as fakearchive:
+                fakearchive.write("fake archive")
+        elif popenargs[0][-2] == "dpkg" and popenargs[0][-1] == "--print-architecture":
+            return subprocess.CompletedProcess("fakerun", 0, 'amd64')
+        else:
+            print('Passthrough: {}'.format(popenargs[0]))
+            return subprocess.run(*popenargs, **kwargs)
 
-            return subprocess.CompletedProcess("fakerun", 0, '')
+        return subprocess.CompletedProcess("fakerun", 0, '')
 
-        monkeypatch.setattr(mockablerun, 'run_mockable', fakerun)
+    monkeypatch.setattr(mockablerun, 'run_mockable', fakerun)
+
+    return fakerun, tar_calls
+
+
+def test_bootstrap(config_files, monkeypatch, tmpdir):
+    with open(config_files, "r") as main_file:
+        fakerun, tar_calls = setup_fake_environment(monkeypatch, str(tmpdir))
 
         monkeypatch.chdir(os.path.dirname(config_files))
 
@@ -85,3 +105,65 @@ def test_bootstrap(config_files, monkeypatch):
         bootstrap_cmd2.run(main_file)
         with open(expected_result, mode="r") as same_result:
             assert same_result.read() == previous_result_text
+
+        fingerprint_file = bootstrap_cmd2._get_fingerprint_file()
+        assert os.path.isfile(fingerprint_file)
+        with open(fingerprint_file, mode="w") as outdated_fingerprint:
+            outdated_fingerprint.write("outdated fingerprint\n")
+        bootstrap_cmd3 = Bootstrap()
+        with requests_mock.Mocker() as m:
+            m.get('https://ftp-master.debian.org/keys/archive-key-8.asc', text='key file mockup')
+            bootstrap_cmd3.run(main_file)
+        with open(expected_result, mode="r") as new_result:
+            assert new_result.read() == "fake archive"
+        with open(fingerprint_file, mode="r") as new_fingerprint:
+            assert new_fingerprint.read().strip() == bootstrap_cmd3._get_fingerprint()
+
+        def norun(*popenargs, **kwargs):
+            if popenargs[0][-2] == "dpkg" and popenargs[0][-1] == "--print-architecture":
+                return subprocess.CompletedProcess("fakerun", 0, 'amd64')
+            assert False, "Unexpected command: {}".format(popenargs[0])
+
+        monkeypatch.setattr(mockablerun, 'run_mockable', norun)
+
+        # the artifact store provides the image without bootstrapping it again
+        os.remove(expected_result)
+        os.remove(fingerprint_file)
+        bootstrap_cmd4 = Bootstrap()
+        assert bootstrap_cmd4.run(main_file) == expected_result
+        with open(expected_result, mode="r") as restored_result:
+            assert restored_result.read() == "fake archive"
+        assert os.path.isfile(fingerprint_file)
+
+        # clean removes the image from the artifact store too
+        bootstrap_cmd4.clean(main_file)
+        assert not os.path.exists(expected_result)
+        assert not os.path.exists(fingerprint_file)
+        assert not os.path.exists(os.path.join(str(tmpdir), 'artifacts', bootstrap_cmd4._get_fingerprint()))
+
+        monkeypatch.setattr(mockablerun, 'run_mockable', fakerun)
+        tar_calls.clear()
+        bootstrap_cmd5 = Bootstrap()
+        with requests_mock.Mocker() as m:
+            m.get('https://ftp-master.debian.org/keys/archive-key-8.asc', text='key file mockup')
+            bootstrap_cmd5.run(main_file)
+        assert len(tar_calls) == 1
+
+
+def test_bootstrap_with_unwritable_cache(config_files, monkeypatch, tmpdir):
+    with open(config_files, "r") as main_file:
+        # the caches are only an optimization - a cache that can not be created does not harm
+        cache_directory = os.path.join(str(tmpdir), 'cache')
+        with open(cache_directory, mode="w") as f:
+            f.write("not a directory")
+        setup_fake_environment(monkeypatch, cache_directory)
+        monkeypatch.chdir(os.path.dirname(config_files))
+
+        bootstrap_cmd = Bootstrap()
+        with requests_mock.Mocker() as m:
+            m.get('https://ftp-master.debian.org/keys/archive-key-8.asc', text='key file mockup')
+            result = bootstrap_cmd.run(main_file)
+
+        with open(result, mode="r") as f:
+            assert f.read() == "fake archive"
+        assert os.path.isfile(bootstrap_cmd._get_fingerprint_file())
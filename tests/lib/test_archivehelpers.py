@@ -19,8 +19,11 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
-from edi.lib.archivehelpers import decompress
+from edi.lib.archivehelpers import decompress, open_compressed, iter_paragraphs_with_offset, get_paragraph_field
+from edi.lib.helpers import FatalError
 import os
+import io
+import pytest
 
 archives = [
     ('bz2', b'BZh91AY&SY\xa9t*,\x00\x00\x01\xd9\x80\x00\x10\x00\x02\x10\x00\x13$\x00\x10 \x00"\x06\x9a=B\x0c\x98\x8cB\x1f\x07\x8b\xb9"\x9c(HT\xba\x15\x16\x00'),
@@ -33,4 +36,36 @@ def test_decompression():
     for algorithm, compressed_data in archives:
         expected_data = '{0}-file\n'.format(algorithm)
         data = decompress(compressed_data).decode('utf-8')
-        assert data == expected_data
\ No newline at end of file
+        assert data == expected_data
+
+
+def test_streamed_decompression(tmpdir):
+    for algorithm, compressed_data in archives:
+        compressed_file = os.path.join(str(tmpdir), 'file.{}'.format(algorithm))
+        with open(compressed_file, mode='wb') as f:
+            f.write(compressed_data)
+
+        with open_compressed(compressed_file) as f:
+            assert f.read().decode('utf-8') == '{0}-file\n'.format(algorithm)
+
+
+def test_unknown_compression(tmpdir):
+    plain_file = os.path.join(str(tmpdir), 'plain')
+    with open(plain_file, mode='wb') as f:
+        f.write(b'plain-file\n')
+
+    with pytest.raises(FatalError):
+        open_compressed(plain_file)
+
+
+def test_paragraphs():
+    data = (b'Package: foo\nDescription: foo\n more foo\n\n\n'
+            b'Package: bar\nVersion: 1.0\n\n'
+            b'Package: baz\n')
+    offsets, paragraphs = zip(*iter_paragraphs_with_offset(io.BytesIO(data)))
+    assert offsets == (0, 42, 69)
+    assert len(paragraphs) == 3
+    assert paragraphs[0] == b'Package: foo\nDescription: foo\n more foo\n'
+    assert [get_paragraph_field(p, 'Package') for p in paragraphs] == ['foo', 'bar', 'baz']
+    assert get_paragraph_field(paragraphs[1], 'Version') == '1.0'
+    assert get_paragraph_field(paragraphs[0], 'Version') is None
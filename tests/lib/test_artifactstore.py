@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+from edi.lib.artifactstore import ArtifactStore
+
+
+def _write_file(path, content):
+    with open(path, mode='w') as f:
+        f.write(content)
+    return path
+
+
+def _read_file(path):
+    with open(path, mode='r') as f:
+        return f.read()
+
+
+def test_store_and_fetch(tmpdir):
+    cache_directory = os.path.join(str(tmpdir), 'cache')
+    store = ArtifactStore(cache_directory, 1024)
+    artifact = _write_file(os.path.join(str(tmpdir), 'artifact'), 'artifact content')
+
+    assert store.fetch('abc', os.path.join(str(tmpdir), 'missing')) is None
+
+    stored_artifact = store.store('abc', artifact)
+    assert stored_artifact == os.path.join(cache_directory, 'artifacts', 'abc')
+
+    destination = os.path.join(str(tmpdir), 'destination')
+    _write_file(destination, 'outdated content')
+    assert store.fetch('abc', destination) == destination
+    assert _read_file(destination) == 'artifact content'
+
+
+def test_corrupt_artifact(tmpdir):
+    store = ArtifactStore(str(tmpdir), 1024)
+    artifact = _write_file(os.path.join(str(tmpdir), 'artifact'), 'artifact content')
+    stored_artifact = store.store('abc', artifact)
+
+    # the stored artifact might be a hard link of the modified file
+    _write_file(stored_artifact, 'modified content')
+    assert store.fetch('abc', os.path.join(str(tmpdir), 'destination')) is None
+    assert not os.path.exists(stored_artifact)
+
+
+def test_eviction(tmpdir):
+    store = ArtifactStore(str(tmpdir), 25)
+    for fingerprint in ['a', 'b']:
+        store.store(fingerprint, _write_file(os.path.join(str(tmpdir), fingerprint), fingerprint * 10))
+
+    # using a protects it from getting evicted
+    assert store.fetch('a', os.path.join(str(tmpdir), 'a')) is not None
+    store.store('c', _write_file(os.path.join(str(tmpdir), 'c'), 'c' * 10))
+
+    artifacts_directory = os.path.join(str(tmpdir), 'artifacts')
+    assert os.path.isfile(os.path.join(artifacts_directory, 'a'))
+    assert not os.path.exists(os.path.join(artifacts_directory, 'b'))
+    assert not os.path.exists(os.path.join(artifacts_directory, 'b.json'))
+    assert os.path.isfile(os.path.join(artifacts_directory, 'c'))
@@ -24,12 +24,20 @@ import os
 import pytest
 from edi.lib.helpers import get_edi_plugin_directory, copy_tree
 from edi.lib.configurationhelpers import ConfigurationTemplate
+from edi.lib import configurationparser
 from edi.lib.configurationparser import ConfigurationParser
 from edi.lib.helpers import FatalError
 from codecs import open
 
 
-def test_configuration_rendering(tmpdir):
+def test_configuration_rendering(tmpdir, tmpdir_factory, monkeypatch):
+    cache_dir_name = tmpdir_factory.mktemp('cache')
+
+    def fake_get_edi_cache_directory():
+        return str(cache_dir_name)
+
+    monkeypatch.setattr(configurationparser, 'get_edi_cache_directory', fake_get_edi_cache_directory)
+
     source = os.path.join(get_edi_plugin_directory(), 'config_templates', 'project_tree')
     assert os.path.isdir(source)
     assert not os.listdir(str(tmpdir)) # target should be empty
@@ -37,6 +45,8 @@ def test_configuration_rendering(tmpdir):
     copy_tree(source, str(tmpdir))
     template_link = os.path.join(str(tmpdir), 'PROJECTNAME-develop.yml.edilink')
     assert os.path.isfile(template_link)
+    static_file = os.path.join(str(tmpdir), 'plugins', 'playbooks', 'sample_playbook', 'main.yml')
+    os.utime(static_file, (0, 0))
 
     template = ConfigurationTemplate(str(tmpdir))
     result = template.render({'edi_project_name': 'test-project'})
@@ -44,6 +54,8 @@ def test_configuration_rendering(tmpdir):
     assert 'plugins/playbooks/sample_playbook/roles/sample_role/tasks/main.yml' in ''.join(result)
 
     assert not os.path.isfile(template_link)
+    # files without template expressions do not get rewritten
+    assert os.path.getmtime(static_file) == 0
 
     test_project_dev = os.path.join(str(tmpdir), 'test-project-develop.yml')
     assert os.path.isfile(test_project_dev)
@@ -62,3 +74,37 @@ def test_configuration_rendering_failure(tmpdir):
         template.render({})
 
     assert 'edi_project_name' in error.value.message
+
+
+def test_configuration_rendering_hidden_folder(tmpdir):
+    hidden_folder = os.path.join(str(tmpdir), 'folder.edihidden')
+    os.mkdir(hidden_folder)
+    with open(os.path.join(hidden_folder, 'PROJECTNAME.yml'), mode='w', encoding='UTF-8') as f:
+        f.write('name: {{ edi_project_name }}\n')
+
+    result = ConfigurationTemplate(str(tmpdir)).render({'edi_project_name': 'test-project'})
+
+    rendered_file = os.path.join(str(tmpdir), '.folder', 'test-project.yml')
+    assert sorted(result) == [os.path.join(str(tmpdir), '.folder'), rendered_file]
+    with open(rendered_file, mode='r', encoding='UTF-8') as f:
+        assert f.read() == 'name: test-project\n'
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_configuration_rendering_unchanged_files(tmpdir, max_workers):
+    static_file = os.path.join(str(tmpdir), 'static.yml')
+    template_file = os.path.join(str(tmpdir), 'template.yml')
+    with open(static_file, mode='w', encoding='UTF-8') as f:
+        f.write('name: foo\n')
+    with open(template_file, mode='w', encoding='UTF-8') as f:
+        f.write('name: {{ edi_project_name }}\n')
+    for path in [static_file, template_file]:
+        os.utime(path, (0, 0))
+
+    ConfigurationTemplate(str(tmpdir)).render({'edi_project_name': 'test-project'}, max_workers=max_workers)
+
+    # only the files with a different rendering result get written
+    assert os.path.getmtime(static_file) == 0
+    assert os.path.getmtime(template_file) != 0
+    with open(template_file, mode='r', encoding='UTF-8') as f:
+        assert f.read() == 'name: test-project\n'
@@ -20,9 +20,12 @@
 # along with edi.  If not, see <http://www.gnu.org/licenses/>.
 
 from aptsources.sourceslist import SourceEntry
-from edi.lib.configurationparser import ConfigurationParser
+from edi.lib import configurationparser
+from edi.lib.configurationparser import (ConfigurationParser, get_base_dictionary,
+                                         invalidate_base_dictionary)
 from tests.libtesting.fixtures.configfiles import config_files, config_name
 import subprocess
+import os
 
 
 def test_project_name(config_files):
@@ -48,6 +51,7 @@ def test_bootstrap_overlay(config_files):
         # the all file shall provide this key
         expected_key = "https://ftp-master.debian.org/keys/archive-key-8.asc"
         assert parser.get_bootstrap_repository_key() == expected_key
+        assert parser.get_bootstrap_repository_key_fingerprint() is None
         assert boostrap_source.dist == "jessie"
         assert parser.get_bootstrap_tool() == "debootstrap"
 
@@ -92,3 +96,61 @@ def test_shared_folders(config_files):
         assert content.get('folder') == 'work'
         assert dict.get('edi_current_user_target_home_directory').startswith('/home/')
 
+
+
+def test_base_dictionary_memoization(monkeypatch):
+    calls = []
+
+    def fake_get_user_environment_variable(name, default=None):
+        calls.append(name)
+        return default or '/home/foo'
+
+    monkeypatch.setattr(configurationparser, 'get_user_environment_variable', fake_get_user_environment_variable)
+    invalidate_base_dictionary()
+
+    base_dict = get_base_dictionary()
+    number_of_calls = len(calls)
+    assert base_dict.get('edi_current_user_host_home_directory') == '/home/foo'
+
+    # callers get a copy
+    base_dict['edi_current_user_host_home_directory'] = '/tmp'
+    assert get_base_dictionary().get('edi_current_user_host_home_directory') == '/home/foo'
+    assert len(calls) == number_of_calls
+
+    invalidate_base_dictionary()
+    get_base_dictionary()
+    assert len(calls) == 2 * number_of_calls
+    invalidate_base_dictionary()
+
+
+def test_merged_configuration_cache(config_files, monkeypatch):
+    ConfigurationParser._configurations.clear()
+    with open(config_files, "r") as main_file:
+        parser = ConfigurationParser(main_file)
+        assert parser.get_compression() == "gz"
+
+    original_merge = ConfigurationParser._merge_configurations
+
+    def fail_merge(*_):
+        assert False
+
+    # the second run uses the cached configuration
+    monkeypatch.setattr(ConfigurationParser, '_merge_configurations', fail_merge)
+    ConfigurationParser._configurations.clear()
+    with open(config_files, "r") as main_file:
+        parser = ConfigurationParser(main_file)
+        assert parser.get_compression() == "gz"
+        assert parser.get_bootstrap_architecture() == "i386"
+
+    # a modified overlay invalidates the cache
+    monkeypatch.setattr(ConfigurationParser, '_merge_configurations', original_merge)
+    global_overlay = os.path.join(os.path.dirname(config_files), "configuration", "overlay",
+                                  "{}.global.yml".format(config_name))
+    with open(global_overlay, "a") as f:
+        f.write("\ngeneral:\n    edi_compression: xz\n")
+    ConfigurationParser._configurations.clear()
+    with open(config_files, "r") as main_file:
+        parser = ConfigurationParser(main_file)
+        assert parser.get_compression() == "xz"
+
+    ConfigurationParser._configurations.clear()
@@ -21,12 +21,18 @@
 
 import requests_mock
 import os
+import re
+import shutil
 import hashlib
 import codecs
 import gzip
+import lzma
 import subprocess
+import pytest
 from tests.libtesting.fixtures.datadir import datadir
 from edi.lib.debhelpers import PackageDownloader
+from edi.lib.filehelpers import hash_file
+from edi.lib.helpers import FatalError
 
 
 class RepositoryMock():
@@ -38,7 +44,10 @@ class RepositoryMock():
             '/keys/test-archive-key.asc': 'test-archive-key.asc',
             '/foodist/dists/stable/main/binary-amd64/Packages.gz': 'binary-amd64_Packages.gz',
             '/foodist/dists/stable/main/binary-all/Packages.gz': 'binary-all_Packages.gz',
-            '/foodist/pool/main/foo_1.0_amd64.deb': 'foo_1.0_amd64.deb'
+            '/foodist/dists/stable/main/binary-amd64/Packages.xz': 'binary-amd64_Packages.xz',
+            '/foodist/dists/stable/main/binary-all/Packages.xz': 'binary-all_Packages.xz',
+            '/foodist/pool/main/foo_1.0_amd64.deb': 'foo_1.0_amd64.deb',
+            '/foodist/pool/main/bar_1.0_all.deb': 'bar_1.0_all.deb'
         }
 
     @staticmethod
@@ -48,7 +57,7 @@ class RepositoryMock():
         return data
 
     def update_checksums(self):
-        deb_names = ['foo_1.0_amd64.deb']
+        deb_names = ['foo_1.0_amd64.deb', 'bar_1.0_all.deb']
         checksum_dict = {}
         for deb_name in deb_names:
             deb_path = os.path.join(str(self.datadir), deb_name)
@@ -71,9 +80,12 @@ class RepositoryMock():
                 bdata = f.read()
             with gzip.open(compressed_package_path, mode='wb') as f:
                 f.write(bdata)
+            with lzma.open('{}.xz'.format(package_path), mode='wb') as f:
+                f.write(bdata)
 
         package_names = ['binary-all_Packages', 'binary-amd64_Packages',
-                         'binary-all_Packages.gz', 'binary-amd64_Packages.gz']
+                         'binary-all_Packages.gz', 'binary-amd64_Packages.gz',
+                         'binary-all_Packages.xz', 'binary-amd64_Packages.xz']
 
         checksum_dict = {}
         for package_name in package_names:
@@ -83,6 +95,7 @@ class RepositoryMock():
                 checksum_dict['__{}_md5__'.format(package_name)] = hashlib.md5(data).hexdigest()
                 checksum_dict['__{}_sha1__'.format(package_name)] = hashlib.sha1(data).hexdigest()
                 checksum_dict['__{}_sha256__'.format(package_name)] = hashlib.sha256(data).hexdigest()
+                checksum_dict['__{}_sha512__'.format(package_name)] = hashlib.sha512(data).hexdigest()
 
         release_file = 'Release'
         release_file_path = os.path.join(str(self.datadir), release_file)
@@ -118,7 +131,21 @@ class RepositoryMock():
     def _send_response(self, request, filename):
         file_path = os.path.join(str(self.datadir), filename)
         with open(file_path, mode='rb') as f:
-            return requests_mock.create_response(request, content=f.read())
+            data = f.read()
+
+        etag = '"{}"'.format(hashlib.sha256(data).hexdigest())
+        if request.headers.get('If-None-Match') == etag:
+            return requests_mock.create_response(request, status_code=304)
+
+        range_match = re.match('bytes=(\\d+)-$', request.headers.get('Range', ''))
+        if range_match:
+            offset = int(range_match.group(1))
+            if offset >= len(data):
+                return requests_mock.create_response(request, status_code=416)
+            return requests_mock.create_response(request, status_code=206, content=data[offset:],
+                                                 headers={'ETag': etag})
+
+        return requests_mock.create_response(request, content=data, headers={'ETag': etag})
 
 
 def do_package_download(datadir, key):
@@ -152,4 +179,309 @@ def test_package_download_without_key(datadir):
     do_package_download(datadir, None)
 
 def test_package_download_with_key(datadir):
-    do_package_download(datadir, 'https://www.example.com/keys/test-archive-key.asc')
\ No newline at end of file
+    do_package_download(datadir, 'https://www.example.com/keys/test-archive-key.asc')
+
+def test_package_download_checksum_mismatch(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        with open(os.path.join(str(datadir), 'foo_1.0_amd64.deb'), mode='ab') as f:
+            f.write(b'tampered')
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['all', 'amd64'])
+        with pytest.raises(FatalError) as error:
+            d.download(package_name='foo', dest=workdir)
+
+        assert 'Checksum mismatch' in error.value.message
+        assert not os.listdir(workdir)
+
+
+def test_package_download_with_cache(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        cache_directory = os.path.join(str(datadir), 'cache')
+        for run in range(2):
+            workdir = os.path.join(str(datadir), 'workdir{}'.format(run))
+            os.mkdir(workdir)
+            d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                                  architectures=['all', 'amd64'],
+                                  cache_directory=cache_directory)
+            result = d.download(package_name='foo', dest=workdir)
+            assert result == os.path.join(workdir, 'foo_1.0_amd64.deb')
+
+        second_run = repository_request_mock.request_history[-3:]
+        assert [r.url for r in second_run] == ['http://www.example.com/foodist/dists/stable/InRelease',
+                                               'http://www.example.com/foodist/dists/stable/Release',
+                                               'http://www.example.com/foodist/pool/main/foo_1.0_amd64.deb']
+        assert second_run[1].headers.get('If-None-Match')
+
+
+def test_package_download_with_unwritable_cache(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        # the cache is only an optimization - a cache that can not be created does not harm
+        cache_directory = os.path.join(str(datadir), 'cache')
+        with open(cache_directory, mode='w') as f:
+            f.write('not a directory')
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['all', 'amd64'],
+                              cache_directory=cache_directory)
+        result = d.download(package_name='foo', dest=workdir)
+        assert result == os.path.join(workdir, 'foo_1.0_amd64.deb')
+
+
+def test_multi_package_download(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['all', 'amd64'])
+        result = d.download_packages(package_names=['foo', 'bar'], dest=workdir, max_workers=2)
+
+        assert result == [os.path.join(workdir, 'foo_1.0_amd64.deb'),
+                          os.path.join(workdir, 'bar_1.0_all.deb')]
+        for package_file in result:
+            assert os.path.isfile(package_file)
+
+        release_requests = [r.url for r in repository_request_mock.request_history if '/dists/' in r.url]
+        assert len(release_requests) == 4 # InRelease, Release and two Packages files
+        # the smallest variant wins
+        assert 'http://www.example.com/foodist/dists/stable/main/binary-amd64/Packages.xz' in release_requests
+
+        with pytest.raises(FatalError) as error:
+            d.download_packages(package_names=['foo', 'baz'], dest=workdir)
+        assert "'baz'" in error.value.message
+
+
+def test_package_download_with_dependencies(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['all', 'amd64'])
+
+        with pytest.raises(FatalError) as error:
+            d.download_packages(package_names=['foo'], dest=workdir, resolve_dependencies=True)
+        assert 'dpkg (>= 1.15.6~)' in error.value.message
+
+        result = d.download_packages(package_names=['foo'], dest=workdir,
+                                     resolve_dependencies=True, exclude=['dpkg'])
+        assert result == [os.path.join(workdir, 'foo_1.0_amd64.deb'),
+                          os.path.join(workdir, 'bar_1.0_all.deb')]
+
+
+def test_compression_preference(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['amd64'], compression_preference=['bz2', 'gz'])
+        d.download(package_name='foo', dest=workdir)
+
+        package_requests = [r.url for r in repository_request_mock.request_history if '/Packages' in r.url]
+        # bz2 is not available
+        assert package_requests == ['http://www.example.com/foodist/dists/stable/main/binary-amd64/Packages.gz']
+
+
+def test_acquire_by_hash(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        release_path = os.path.join(str(datadir), 'Release')
+        with open(release_path, encoding='utf-8', mode='r') as f:
+            data = f.read()
+        with open(release_path, encoding='utf-8', mode='w') as f:
+            f.write(data.replace('Description:', 'Acquire-By-Hash: yes\nDescription:'))
+
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        by_hash_urls = {}
+        for architecture in ['all', 'amd64']:
+            with open(os.path.join(str(datadir), 'binary-{}_Packages.xz'.format(architecture)), mode='rb') as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()
+            by_hash_urls[architecture] = '/foodist/dists/stable/main/binary-{}/by-hash/SHA256/{}'.format(
+                architecture, checksum)
+        # binary-all is not available by hash
+        repository_mock.repository_items[by_hash_urls['amd64']] = 'binary-amd64_Packages.xz'
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['all', 'amd64'])
+        d.download_packages(package_names=['foo', 'bar'], dest=workdir)
+
+        package_requests = [r.url for r in repository_request_mock.request_history if '/binary-' in r.url]
+        assert package_requests == ['http://www.example.com{}'.format(by_hash_urls['all']),
+                                    'http://www.example.com/foodist/dists/stable/main/binary-all/Packages.xz',
+                                    'http://www.example.com{}'.format(by_hash_urls['amd64'])]
+
+
+@pytest.mark.parametrize('with_sha512', [False, True])
+def test_pdiff_update(datadir, with_sha512):
+    with requests_mock.Mocker() as repository_request_mock:
+        release_path = os.path.join(str(datadir), 'Release')
+        with open(release_path, encoding='utf-8', mode='r') as f:
+            release_template = f.read()
+        if with_sha512:
+            # the strongest checksums differ from the SHA256 checksums used by the pdiffs
+            release_template = release_template.rstrip() + '\nSHA512:\n' + ''.join(
+                ' __{}_sha512__ 0 main/{}\n'.format(name, name.replace('_', '/'))
+                for name in ['binary-amd64_Packages', 'binary-amd64_Packages.gz', 'binary-amd64_Packages.xz'])
+            with open(release_path, encoding='utf-8', mode='w') as f:
+                f.write(release_template)
+        checksum = hashlib.sha512 if with_sha512 else hashlib.sha256
+
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        cache_directory = os.path.join(str(datadir), 'cache')
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['amd64'], cache_directory=cache_directory)
+        d.download(package_name='foo', dest=workdir)
+
+        # publish an updated Packages file together with the corresponding pdiff
+        packages_path = os.path.join(str(datadir), 'binary-amd64_Packages')
+        with open(packages_path, mode='rb') as f:
+            old_packages = f.read()
+        new_paragraph = b'\nPackage: baz\nVersion: 1.0\n'
+        with open(packages_path, mode='wb') as f:
+            f.write(old_packages + new_paragraph)
+        patch = '{}a\n'.format(len(old_packages.splitlines())).encode() + new_paragraph + b'.\n'
+        with gzip.open(os.path.join(str(datadir), 'patch.gz'), mode='wb') as f:
+            f.write(patch)
+        with open(os.path.join(str(datadir), 'patch.gz'), mode='rb') as f:
+            compressed_patch = f.read()
+
+        diff_index = ('SHA256-Current: {} 0\n'
+                      'SHA256-History:\n {} 0 T-1\n'
+                      'SHA256-Patches:\n {} 0 T-1\n'
+                      'SHA256-Download:\n {} 0 T-1.gz\n'
+                      ).format(hashlib.sha256(old_packages + new_paragraph).hexdigest(),
+                               hashlib.sha256(old_packages).hexdigest(),
+                               hashlib.sha256(patch).hexdigest(),
+                               hashlib.sha256(compressed_patch).hexdigest())
+        with open(os.path.join(str(datadir), 'diff_Index'), encoding='utf-8', mode='w') as f:
+            f.write(diff_index)
+
+        with open(release_path, encoding='utf-8', mode='w') as f:
+            f.write(release_template.rstrip() + '\n {} 0 main/binary-amd64/Packages.diff/Index\n'.format(
+                checksum(diff_index.encode()).hexdigest()))
+        repository_mock.update_checksums()
+        repository_mock.repository_items['/foodist/dists/stable/main/binary-amd64/Packages.diff/Index'] = 'diff_Index'
+        repository_mock.repository_items['/foodist/dists/stable/main/binary-amd64/Packages.diff/T-1.gz'] = 'patch.gz'
+
+        request_count = len(repository_request_mock.request_history)
+        d.download(package_name='foo', dest=workdir)
+
+        second_run = [r.url for r in repository_request_mock.request_history[request_count:]]
+        assert 'http://www.example.com/foodist/dists/stable/main/binary-amd64/Packages.diff/T-1.gz' in second_run
+        assert not [url for url in second_run if url.endswith('Packages.xz') or url.endswith('Packages.gz')]
+        with open(os.path.join(cache_directory, 'repositories',
+                               'www.example.com_foodist_dists_stable', 'main_binary-amd64_Packages'), mode='rb') as f:
+            assert f.read() == old_packages + new_paragraph
+
+        # the patched index matches the Release file - neither the index nor the pdiffs get fetched again
+        request_count = len(repository_request_mock.request_history)
+        d.download(package_name='foo', dest=workdir)
+        third_run = [r.url for r in repository_request_mock.request_history[request_count:]]
+        assert not [url for url in third_run if 'Packages' in url]
+
+
+def test_resume_download(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        with open(os.path.join(str(datadir), 'foo_1.0_amd64.deb'), mode='rb') as f:
+            deb_data = f.read()
+        # leftover of an interrupted download
+        with open(os.path.join(workdir, 'foo_1.0_amd64.deb.part'), mode='wb') as f:
+            f.write(deb_data[:100])
+
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['amd64'])
+        result = d.download(package_name='foo', dest=workdir)
+
+        deb_request = repository_request_mock.request_history[-1]
+        assert deb_request.headers.get('Range') == 'bytes=100-'
+        assert os.listdir(workdir) == ['foo_1.0_amd64.deb']
+        with open(result, mode='rb') as f:
+            assert f.read() == deb_data
+
+
+def test_resume_download_of_outdated_part(datadir):
+    with requests_mock.Mocker() as repository_request_mock:
+        repository_mock = RepositoryMock(datadir)
+        repository_mock.update_checksums()
+        repository_request_mock.add_matcher(repository_mock.repository_matcher)
+
+        workdir = os.path.join(str(datadir), 'workdir')
+        os.mkdir(workdir)
+        with open(os.path.join(workdir, 'foo_1.0_amd64.deb.part'), mode='wb') as f:
+            f.write(b'outdated')
+
+        d = PackageDownloader(repository='deb http://www.example.com/foodist/ stable main',
+                              architectures=['amd64'])
+        d.download(package_name='foo', dest=workdir)
+
+        deb_requests = [r for r in repository_request_mock.request_history if r.url.endswith('.deb')]
+        assert len(deb_requests) == 2
+        assert not deb_requests[1].headers.get('Range')
+        assert os.listdir(workdir) == ['foo_1.0_amd64.deb']
+
+
+@pytest.mark.parametrize('uri_format', ['file://{}', 'file:{}', '{}'])
+def test_local_mirror(datadir, uri_format):
+    repository_mock = RepositoryMock(datadir)
+    repository_mock.update_checksums()
+    mirror = os.path.join(str(datadir), 'mirror')
+    for url_path, filename in repository_mock.repository_items.items():
+        if url_path.startswith('/foodist/') and os.path.isfile(os.path.join(str(datadir), filename)):
+            local_path = os.path.join(mirror, url_path[len('/foodist/'):])
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            shutil.copyfile(os.path.join(str(datadir), filename), local_path)
+
+    workdir = os.path.join(str(datadir), 'workdir')
+    os.mkdir(workdir)
+    with requests_mock.Mocker() as repository_request_mock:
+        d = PackageDownloader(repository='deb {} stable main'.format(uri_format.format(mirror)),
+                              architectures=['all', 'amd64'], cache_directory=os.path.join(str(datadir), 'cache'))
+        result = d.download_packages(package_names=['foo', 'bar'], dest=workdir)
+        assert not repository_request_mock.request_history
+
+    assert result == [os.path.join(workdir, 'foo_1.0_amd64.deb'),
+                      os.path.join(workdir, 'bar_1.0_all.deb')]
+    with open(result[0], mode='rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == hash_file(os.path.join(str(datadir), 'foo_1.0_amd64.deb'),
+                                                                 'sha256')
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import gzip
+import pytest
+from edi.lib.packagesindex import PackagesIndex
+from edi.lib.dependencyresolver import DependencyResolver, is_version_satisfied
+from edi.lib.helpers import FatalError
+
+packages_data = b"""Package: tool
+Version: 1.0
+Pre-Depends: libbase (>= 2.0)
+Depends: libfoo | libbar, mta, libold (<< 1.0)
+
+Package: libbase
+Version: 1.5
+
+Package: libbase
+Version: 2.1
+
+Package: libbar
+Version: 1.0
+Depends: libbase
+
+Package: postfix
+Version: 3.1
+Provides: mail-transport-agent, mta
+
+Package: libold
+Version: 0.9
+
+Package: broken
+Version: 1.0
+Depends: libbase (>= 3.0)
+
+Package: oldtool
+Version: 1.0
+Depends: libbase (<< 2.0)
+
+Package: newtool
+Version: 1.0
+Depends: libbase (>= 2.0)
+"""
+
+
+def build_index(tmpdir):
+    compressed_file = os.path.join(str(tmpdir), 'Packages.gz')
+    with gzip.open(compressed_file, mode='wb') as f:
+        f.write(packages_data)
+
+    return PackagesIndex.build(compressed_file, os.path.join(str(tmpdir), 'Packages'))
+
+
+def test_version_constraints():
+    assert is_version_satisfied('1.0', None)
+    assert is_version_satisfied('1.0', ('>=', '1.0~rc1'))
+    assert not is_version_satisfied('1.0', ('<<', '1.0'))
+    assert is_version_satisfied('1:0.1', ('>>', '2.0'))
+    assert is_version_satisfied('2.0-1', ('=', '2.0-1'))
+
+
+def test_resolve(tmpdir):
+    resolver = DependencyResolver([build_index(tmpdir)])
+    packages = resolver.resolve(['tool'])
+    assert [p['Package'] for p in packages] == ['tool', 'libbase', 'libbar', 'postfix', 'libold']
+    assert packages[1]['Version'] == '2.1'
+
+
+def test_resolve_with_exclude(tmpdir):
+    resolver = DependencyResolver([build_index(tmpdir)], exclude=['libbase', 'mta'])
+    packages = resolver.resolve(['tool'])
+    assert [p['Package'] for p in packages] == ['tool', 'libbar', 'libold']
+
+
+def test_unresolvable_dependency(tmpdir):
+    resolver = DependencyResolver([build_index(tmpdir)])
+    with pytest.raises(FatalError) as error:
+        resolver.resolve(['broken'])
+    assert 'libbase (>= 3.0)' in error.value.message
+
+
+def test_conflicting_dependencies(tmpdir):
+    resolver = DependencyResolver([build_index(tmpdir)])
+    with pytest.raises(FatalError) as error:
+        resolver.resolve(['oldtool', 'newtool'])
+    assert "'libbase (>= 2.0)' of package 'newtool'" in error.value.message
+    assert "version '1.5' of package 'libbase'" in error.value.message
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import fcntl
+import pytest
+from edi.lib.filehelpers import atomic_file, write_file_atomically, link_file, file_lock
+
+
+def test_atomic_file(tmpdir):
+    destination = os.path.join(str(tmpdir), 'destination')
+    write_file_atomically(destination, 'old content')
+
+    with pytest.raises(RuntimeError):
+        with atomic_file(destination) as temp_path:
+            with open(temp_path, mode='w') as f:
+                f.write('partial content')
+            raise RuntimeError('interrupted')
+
+    with open(destination, mode='r') as f:
+        assert f.read() == 'old content'
+    assert os.listdir(str(tmpdir)) == ['destination']
+
+    with atomic_file(destination) as first_path, atomic_file(destination) as second_path:
+        # concurrent writers do not share a temporary file
+        assert first_path != second_path
+        write_file_atomically(first_path, 'first content')
+        write_file_atomically(second_path, 'second content')
+
+    with open(destination, mode='r') as f:
+        assert f.read() == 'first content'
+    assert os.listdir(str(tmpdir)) == ['destination']
+
+
+def test_link_file(tmpdir):
+    source = write_file_atomically(os.path.join(str(tmpdir), 'source'), 'content')
+    destination = write_file_atomically(os.path.join(str(tmpdir), 'destination'), 'old content')
+
+    assert link_file(source, destination) == destination
+    with open(destination, mode='r') as f:
+        assert f.read() == 'content'
+    assert sorted(os.listdir(str(tmpdir))) == ['destination', 'source']
+
+
+def test_file_lock(tmpdir):
+    lock_file = os.path.join(str(tmpdir), 'download.lock')
+    with file_lock(lock_file):
+        # another process (open file description) can not acquire the lock
+        with open(lock_file, mode='a') as f:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    with open(lock_file, mode='a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2016 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from edi.lib import jinja2helpers
+from edi.lib.jinja2helpers import compile_template, render_template, enable_bytecode_cache
+
+
+def test_compile_once():
+    source = 'Hello {{ name }}!'
+    assert compile_template(source) is compile_template(source)
+    assert render_template(source, {'name': 'edi'}) == 'Hello edi!'
+
+
+def test_compact_mode():
+    source = '{% if True %}\n  foo\n{% endif %}\n'
+    assert render_template(source, {}) == '\n  foo\n'
+    assert render_template(source, {}, compact=True) == '  foo\n'
+    # only the compact mode preserves the trailing newline
+    assert render_template('a: b\n', {}) == 'a: b'
+    assert render_template('a: b\n', {}, compact=True) == 'a: b\n'
+
+
+def test_bytecode_cache(tmpdir, monkeypatch):
+    cache_directory = os.path.join(str(tmpdir), 'jinja2')
+    monkeypatch.setattr(jinja2helpers, '_templates', {})
+    monkeypatch.setattr(jinja2helpers, '_bytecode_cache', None)
+    enable_bytecode_cache(cache_directory)
+
+    source = '{{ a }} + {{ b }}'
+    assert render_template(source, {'a': 1, 'b': 2}) == '1 + 2'
+    assert len(os.listdir(cache_directory)) == 1
+
+    # a new process reuses the compiled template
+    monkeypatch.setattr(jinja2helpers, '_templates', {})
+    assert render_template(source, {'a': 3, 'b': 4}) == '3 + 4'
+    assert len(os.listdir(cache_directory)) == 1
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pytest
+import requests_mock
+from tests.libtesting.fixtures.datadir import datadir
+from edi.lib import keyhelpers
+from edi.lib.keyhelpers import get_keyring, fetch_repository_key
+from edi.lib.helpers import FatalError
+
+key_url = 'https://www.example.com/keys/test-archive-key.asc'
+key_fingerprint = 'A3C7 E53C 8F10 EAF9 B984  5F11 38E2 C7F4 F28F 5993'
+
+
+def test_get_keyring(datadir):
+    with open(os.path.join(str(datadir), 'test-archive-key.asc'), encoding='utf-8', mode='r') as f:
+        key_data = f.read()
+
+    cache_directory = os.path.join(str(datadir), 'cache')
+    keyring = get_keyring(key_data, cache_directory=cache_directory)
+    assert os.path.isfile(keyring)
+    assert os.path.dirname(keyring) == os.path.join(cache_directory, 'keyrings')
+    modification_time = os.path.getmtime(keyring)
+
+    # the key gets imported only once
+    assert get_keyring(key_data, cache_directory=cache_directory) == keyring
+    assert os.path.getmtime(keyring) == modification_time
+    assert os.listdir(os.path.dirname(keyring)) == [os.path.basename(keyring)]
+
+    assert get_keyring(None) is None
+
+
+def test_get_keyring_with_unwritable_cache(datadir, monkeypatch):
+    monkeypatch.setattr(keyhelpers, '_keyrings', {})
+    with open(os.path.join(str(datadir), 'test-archive-key.asc'), encoding='utf-8', mode='r') as f:
+        key_data = f.read()
+
+    cache_directory = os.path.join(str(datadir), 'cache')
+    with open(cache_directory, mode='w') as f:
+        f.write('not a directory')
+
+    # the keyring gets built within a temporary directory instead
+    keyring = get_keyring(key_data, cache_directory=cache_directory)
+    assert os.path.isfile(keyring)
+    assert not keyring.startswith(cache_directory)
+
+
+def test_fetch_repository_key_with_cache(datadir):
+    with open(os.path.join(str(datadir), 'test-archive-key.asc'), encoding='utf-8', mode='r') as f:
+        key_data = f.read()
+
+    cache_directory = os.path.join(str(datadir), 'cache')
+    with requests_mock.Mocker() as key_request_mock:
+        key_request_mock.get(key_url, text=key_data)
+        assert fetch_repository_key(key_url, cache_directory=cache_directory,
+                                    fingerprint=key_fingerprint) == key_data
+        # the cached key gets used
+        assert fetch_repository_key(key_url, cache_directory=cache_directory,
+                                    fingerprint=key_fingerprint) == key_data
+        assert fetch_repository_key(key_url, cache_directory=cache_directory) == key_data
+        assert key_request_mock.call_count == 1
+
+        # a cached key that does not match the pin gets fetched again
+        with pytest.raises(FatalError) as error:
+            fetch_repository_key(key_url, cache_directory=cache_directory, fingerprint='DEADBEEF')
+        assert 'fingerprint' in error.value.message
+        assert key_request_mock.call_count == 2
+
+
+def test_fetch_repository_key_with_additional_key(datadir):
+    key_data = ''
+    for key_file in ['test-archive-key.asc', 'other-archive-key.asc']:
+        with open(os.path.join(str(datadir), key_file), encoding='utf-8', mode='r') as f:
+            key_data += f.read()
+
+    cache_directory = os.path.join(str(datadir), 'cache')
+    with requests_mock.Mocker() as key_request_mock:
+        key_request_mock.get(key_url, text=key_data)
+        # the additional key would be able to sign a Release file too
+        with pytest.raises(FatalError) as error:
+            fetch_repository_key(key_url, cache_directory=cache_directory, fingerprint=key_fingerprint)
+        assert 'fingerprint' in error.value.message
+        assert not os.path.exists(os.path.join(cache_directory, 'keys'))
+
+
+def test_fetch_repository_key_with_unwritable_cache(datadir):
+    with open(os.path.join(str(datadir), 'test-archive-key.asc'), encoding='utf-8', mode='r') as f:
+        key_data = f.read()
+
+    cache_directory = os.path.join(str(datadir), 'cache')
+    with open(cache_directory, mode='w') as f:
+        f.write('not a directory')
+
+    with requests_mock.Mocker() as key_request_mock:
+        key_request_mock.get(key_url, text=key_data)
+        assert fetch_repository_key(key_url, cache_directory=cache_directory,
+                                    fingerprint=key_fingerprint) == key_data
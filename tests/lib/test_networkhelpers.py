@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+from edi.lib.networkhelpers import create_http_session, get_http_session
+
+
+def test_shared_http_session():
+    assert get_http_session() is get_http_session()
+
+
+def test_http_session_setup():
+    session = create_http_session(pool_size=4, retries=5)
+    for prefix in ['http://', 'https://']:
+        adapter = session.get_adapter('{}www.example.com'.format(prefix))
+        assert adapter.max_retries.total == 5
+        assert adapter._pool_maxsize == 4
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import gzip
+from edi.lib.packagesindex import PackagesIndex
+
+packages_data = b"""Package: foo
+Version: 1.0
+Description: foo
+ more foo
+
+Package: bar
+Version: 2.0
+
+Package: foo
+Version: 0.9
+"""
+
+
+def test_packages_index(tmpdir):
+    compressed_file = os.path.join(str(tmpdir), 'Packages.gz')
+    with gzip.open(compressed_file, mode='wb') as f:
+        f.write(packages_data)
+
+    packages_file = os.path.join(str(tmpdir), 'Packages')
+    index = PackagesIndex.build(compressed_file, packages_file)
+    assert os.path.isfile(packages_file)
+    assert PackagesIndex.is_valid(index.get_index_file())
+
+    reloaded_index = PackagesIndex(packages_file)
+    assert 'bar' in reloaded_index
+    assert 'baz' not in reloaded_index
+    assert reloaded_index.lookup('baz') is None
+    assert reloaded_index.lookup('bar')['Version'] == '2.0'
+    foo = reloaded_index.lookup('foo')
+    assert foo['Version'] == '1.0'
+    assert foo['Description'] == 'foo\n more foo'
+    assert [p['Version'] for p in reloaded_index.lookup_all('foo')] == ['1.0', '0.9']
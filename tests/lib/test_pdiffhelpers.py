@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2017 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import pytest
+from edi.lib.pdiffhelpers import parse_diff_index, get_patch_names, apply_ed_patch
+from edi.lib.helpers import FatalError
+
+diff_index_data = """SHA256-Current: cccc 300
+SHA256-History:
+ aaaa 100 T-2017-01-01-0000.00
+ bbbb 200 T-2017-01-02-0000.00
+SHA256-Patches:
+ 1111 10 T-2017-01-01-0000.00
+ 2222 20 T-2017-01-02-0000.00
+SHA256-Download:
+ 3333 5 T-2017-01-01-0000.00.gz
+ 4444 6 T-2017-01-02-0000.00.gz
+"""
+
+
+def test_parse_diff_index(tmpdir):
+    index_file = os.path.join(str(tmpdir), 'Index')
+    with open(index_file, encoding='utf-8', mode='w') as f:
+        f.write(diff_index_data)
+
+    diff_index = parse_diff_index(index_file)
+    assert diff_index['current'] == 'cccc'
+    assert diff_index['patches']['T-2017-01-02-0000.00'] == '2222'
+    assert diff_index['downloads']['T-2017-01-01-0000.00'] == ('3333', 'T-2017-01-01-0000.00.gz')
+    assert not diff_index['merged']
+
+    assert get_patch_names(diff_index, 'cccc') == []
+    assert get_patch_names(diff_index, 'aaaa') == ['T-2017-01-01-0000.00', 'T-2017-01-02-0000.00']
+    assert get_patch_names(diff_index, 'bbbb') == ['T-2017-01-02-0000.00']
+    assert get_patch_names(diff_index, 'dddd') is None
+
+    diff_index['merged'] = True
+    assert get_patch_names(diff_index, 'aaaa') == ['T-2017-01-01-0000.00']
+
+
+def test_apply_ed_patch():
+    # generated using diff --ed
+    patch = b"5a\nf\n.\n4c\nD\nD2\n.\n2d\n0a\nx\n.\n"
+    source = io.BytesIO(b"a\nb\nc\nd\ne\n")
+    destination = io.BytesIO()
+    apply_ed_patch(source, patch, destination)
+    assert destination.getvalue() == b"x\na\nc\nD\nD2\ne\nf\n"
+
+
+def test_apply_ed_patch_mismatch():
+    with pytest.raises(FatalError) as error:
+        apply_ed_patch(io.BytesIO(b"a\n"), b"3d\n", io.BytesIO())
+    assert 'does not match' in error.value.message
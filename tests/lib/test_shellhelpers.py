@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2016 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import subprocess
+from edi.lib import mockablerun
+from edi.lib.shellhelpers import (get_user_environment_variable, get_user_environment,
+                                  invalidate_user_environment, get_debian_architecture)
+from edi.lib.helpers import invalidate_host_facts
+
+
+def test_user_environment(monkeypatch):
+    commands = []
+
+    def fakerun(*popenargs, **kwargs):
+        commands.append(popenargs[0])
+        return subprocess.CompletedProcess("fakerun", 0, 'HOME=/home/foo\0http_proxy=http://a=b\0MULTI=a\nb\0')
+
+    monkeypatch.setattr(mockablerun, 'run_mockable', fakerun)
+    invalidate_user_environment()
+
+    assert get_user_environment_variable('HOME') == '/home/foo'
+    assert get_user_environment_variable('http_proxy') == 'http://a=b'
+    assert get_user_environment_variable('MULTI') == 'a\nb'
+    assert get_user_environment_variable('no_proxy', '') == ''
+    assert get_user_environment_variable('no_proxy') is None
+    get_user_environment()['HOME'] = '/tmp'
+    assert get_user_environment_variable('HOME') == '/home/foo'
+    # a single snapshot serves all lookups
+    assert len(commands) == 1
+    assert commands[0][-2:] == ['env', '-0']
+
+    invalidate_user_environment()
+
+
+def test_debian_architecture(monkeypatch):
+    commands = []
+
+    def fakerun(*popenargs, **kwargs):
+        commands.append(popenargs[0])
+        return subprocess.CompletedProcess("fakerun", 0, 'armhf\n')
+
+    monkeypatch.setattr(mockablerun, 'run_mockable', fakerun)
+    invalidate_host_facts()
+
+    assert get_debian_architecture() == 'armhf'
+    assert get_debian_architecture() == 'armhf'
+    assert len(commands) == 1
+
+    invalidate_host_facts()
+    assert get_debian_architecture() == 'armhf'
+    assert len(commands) == 2
+
+    invalidate_host_facts()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2016 Matthias Luescher
+#
+# Authors:
+#  Matthias Luescher
+#
+# This file is part of edi.
+#
+# edi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# edi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with edi.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import logging
+from edi.lib import yamlhelpers
+from edi.lib.yamlhelpers import safe_load, safe_dump, YAMLError, LazyDump
+
+
+def test_round_trip():
+    data = {'foo': [1, 2, {'bar': 'baz'}], 'empty': None}
+    assert safe_load(safe_dump(data)) == data
+    assert safe_dump({'a': 1}, default_flow_style=False) == 'a: 1\n'
+
+
+def test_unsafe_document():
+    with pytest.raises(YAMLError):
+        safe_load('!!python/object/apply:os.system ["true"]')
+
+
+def test_lazy_dump(monkeypatch, caplog):
+    dumped = []
+
+    def fake_safe_dump(data, **kwargs):
+        dumped.append(data)
+        return 'dumped'
+
+    monkeypatch.setattr(yamlhelpers, 'safe_dump', fake_safe_dump)
+
+    with caplog.at_level(logging.WARNING):
+        logging.info("Data:\n%s", LazyDump({'foo': 'bar'}))
+    assert not dumped
+
+    with caplog.at_level(logging.INFO):
+        logging.info("Data:\n%s", LazyDump({'foo': 'bar'}))
+    # every handler formats the record
+    assert dumped and all(data == {'foo': 'bar'} for data in dumped)
+    assert 'Data:\ndumped' in caplog.text
@@ -22,6 +22,7 @@
 import pytest
 import os
 from edi.lib.helpers import get_user, get_hostname
+from edi.lib import configurationparser
 
 sample_file = """
 ---
@@ -99,8 +100,14 @@ empty_config_name = "empty"
 
 
 @pytest.fixture(scope='function')
-def config_files(tmpdir_factory):
+def config_files(tmpdir_factory, monkeypatch):
     dir_name = tmpdir_factory.mktemp('configuration')
+    cache_dir_name = tmpdir_factory.mktemp('cache')
+
+    def fake_get_edi_cache_directory():
+        return str(cache_dir_name)
+
+    monkeypatch.setattr(configurationparser, 'get_edi_cache_directory', fake_get_edi_cache_directory)
     main_file = "{0}.yml".format(config_name)
     with open(str(dir_name.join(main_file)), "w") as file:
         file.write(sample_file)
@@ -124,8 +131,14 @@ def config_files(tmpdir_factory):
 
 
 @pytest.fixture(scope='function')
-def empty_config_file(tmpdir_factory):
+def empty_config_file(tmpdir_factory, monkeypatch):
     dir_name = tmpdir_factory.mktemp('configuration')
+    cache_dir_name = tmpdir_factory.mktemp('cache')
+
+    def fake_get_edi_cache_directory():
+        return str(cache_dir_name)
+
+    monkeypatch.setattr(configurationparser, 'get_edi_cache_directory', fake_get_edi_cache_directory)
     main_file = "{0}.yml".format(empty_config_name)
     with open(str(dir_name.join(main_file)), "w") as file:
         file.write("")